@@ -1,21 +1,27 @@
-import traceback
+import sys
 from asyncio import Lock
-from functools import partial
-from typing import TYPE_CHECKING, Any, List, Mapping, Optional, Union
+from contextvars import ContextVar
+from functools import lru_cache, partial
+from os import path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple, Union
 
 from databases import Database
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from sqlalchemy import MetaData
 
 from scrudge_orm.backends.consts import SupportedDriver
-from scrudge_orm.backends.patched_transaction import ON_TRANSACTION, PatchedTransaction
+from scrudge_orm.backends.patched_transaction import PatchedTransaction
 
 if TYPE_CHECKING:
-    from sqlalchemy.sql import ClauseElement
+    from types import FrameType
+
+    from sqlalchemy.sql import ClauseElement, Insert
 
 
 # This class is parent for childhoods, it is the reason why slots is False
 class DatabaseSettings(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     driver: SupportedDriver
 
     user: str
@@ -30,17 +36,45 @@ class DatabaseSettings(BaseModel):
     min_pool_size: Optional[int] = None
 
     def get_connection_string(self, force_driver: Optional[SupportedDriver] = None) -> str:
-        driver = force_driver or self.driver
+        return self.build_connection_string(
+            force_driver or self.driver, self.user, self.password, self.db, self.host, self.port, self.socket
+        )
 
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def build_connection_string(
+        driver: SupportedDriver,
+        user: str,
+        password: str,
+        db: str,
+        host: Optional[str],
+        port: Optional[int],
+        socket: Optional[str],
+    ) -> str:
+        """
+        Connection string is cached by values of settings fields, so copies of settings with other values get own one
+        :return: connection string
+        """
         return (
-            f"{driver.value}://{self.user}:{self.password}@/{self.db}?host={self.socket}"
-            if self.socket is not None
-            else f"{driver.value}://{self.user}:{self.password}@{self.host}:{self.port}/{self.db}"
+            f"{driver.value}://{user}:{password}@/{db}?host={socket}"
+            if socket is not None
+            else f"{driver.value}://{user}:{password}@{host}:{port}/{db}"
         )
 
 
 class DatabaseBackend:
-    __slots__ = ("metadata", "pool", "_connect_lock", "project_root_dir", "tag_sql_queries")
+    __slots__ = (
+        "metadata",
+        "pool",
+        "_connect_lock",
+        "project_root_dir",
+        "project_root_prefix",
+        "tag_sql_queries",
+        "transaction_depth",
+    )
+
+    # database can compare column with array parameter: column = ANY(array)
+    supports_array_comparison = False
 
     def __init__(
         self,
@@ -57,17 +91,23 @@ class DatabaseBackend:
         )
         self.metadata = MetaData()
         self.project_root_dir = project_root_dir
+        # root dir with trailing separator, computed once for query tagging
+        self.project_root_prefix = path.join(project_root_dir, "")
         self.tag_sql_queries = tag_sql_queries
-        self._connect_lock: Optional[Lock] = None
+        # since python 3.10 lock is bound to the event loop on first use, so it's safe to create it there
+        self._connect_lock = Lock()
+        self.transaction_depth: ContextVar[int] = ContextVar(f"transaction-depth-{id(self)}", default=0)
 
     @property
     def lock(self) -> Lock:
-        if self._connect_lock is None:
-            self._connect_lock = Lock()
         return self._connect_lock
 
     async def connect(self) -> None:
-        async with self.lock:
+        # fast path, already connected pool doesn't need the lock
+        if self.pool.is_connected:
+            return None
+
+        async with self._connect_lock:
             if not self.pool.is_connected:
                 await self.pool.connect()
 
@@ -76,9 +116,7 @@ class DatabaseBackend:
         return PatchedTransaction(self, self.pool.connection, force_rollback=force_rollback, **kwargs)
 
     def is_on_transaction(self) -> bool:
-        transaction_counters = ON_TRANSACTION.get()
-
-        return bool(transaction_counters[id(self)])
+        return bool(self.transaction_depth.get())
 
     async def execute(self, query: Union[str, "ClauseElement"], values: Optional[dict] = None) -> Any:
         await self.connect()
@@ -88,52 +126,103 @@ class DatabaseBackend:
         await self.connect()
         return await self.pool.execute_many(query, values)
 
+    async def fetch_all_insert_values(
+        self, query: "Insert", values: List[Dict], cache_key: Optional[Hashable] = None
+    ) -> List[Mapping]:
+        """
+        Insert several rows with one statement
+        :param query: sqlalchemy insert query without values, returning and on conflict parts are allowed
+        :param values: list of dictionaries with rows to insert
+        :param cache_key: key describing shape of on conflict part, insert with on conflict part is cached by it only
+        :return: rows from returning part
+        """
+        return await self.fetch_all(query.values(values))
+
+    async def execute_insert_values(self, query: "Insert", values: List[Dict]) -> None:
+        """
+        Insert several rows with one statement without fetching result
+        :param query: sqlalchemy insert query without values and returning part
+        :param values: list of dictionaries with rows to insert
+        :return: None
+        """
+        await self.execute(query.values(values))
+
+    async def fetch_all_cached(
+        self, cache_key: Optional[Hashable], build_query: Callable[[Dict], "ClauseElement"], params: Dict
+    ) -> List[Mapping]:
+        """
+        Fetch rows of query, backend can reuse compiled statement for queries with the same cache key
+        :param cache_key: key describing shape of statement, None disables cache
+        :param build_query: function to build query with bind parameters from params
+        :param params: values of query bind parameters
+        :return: rows
+        """
+        return await self.fetch_all(build_query(params))
+
     @staticmethod
-    def compile_query_with_comments(
-        query: Union[str, "ClauseElement"], project_root_dir: str, *args: Any, **kwargs: Any
-    ) -> Any:
-        compile_result = query.sqlalchemy_compile(*args, **kwargs)  # type: ignore
-
-        try:
-            trace_stack = traceback.extract_stack()
-            outer_frame, inner_frame = None, None
-            for frame in trace_stack:
-                if frame.filename.startswith(project_root_dir) and "scrudge_orm" not in frame.filename:
-                    inner_frame = frame
-                    if outer_frame is None:
-                        outer_frame = frame
-        except StopIteration:
-            pass
-        else:
-            if inner_frame is not None and outer_frame is not None:
-                inner_file_name = inner_frame.filename[len(project_root_dir) + 1 :]  # +1 для `/`
-                outer_file_name = outer_frame.filename[len(project_root_dir) + 1 :]  # +1 для `/`
-                compile_result.string = (
-                    f"/* inner_func:{inner_frame.name}, inner_line:{inner_file_name}:{inner_frame.lineno},"
-                    f" outer_func:{outer_frame.name}, outer_line:{outer_file_name}:{outer_frame.lineno} */ "
-                    f"{compile_result.string}"
-                )
+    def get_query_comment(project_root_prefix: str) -> Optional[str]:
+        """
+        Find the innermost and the outermost project frames, that called database backend
+        :param project_root_prefix: project root directory with trailing separator, frames outside of it are skipped
+        :return: sql comment with caller info or None if there is no project frames in stack
+        """
+        # walk frames manually, traceback.extract_stack reads source lines of every frame
+        inner_frame: Optional[Tuple[str, str, int]] = None
+        outer_frame: Optional[Tuple[str, str, int]] = None
+        frame: Optional["FrameType"] = sys._getframe(1)
+
+        while frame is not None:
+            file_name = frame.f_code.co_filename
+
+            if file_name.startswith(project_root_prefix) and "scrudge_orm" not in file_name:
+                outer_frame = (file_name, frame.f_code.co_name, frame.f_lineno)
+
+                if inner_frame is None:
+                    inner_frame = outer_frame
+
+            frame = frame.f_back
+
+        if inner_frame is None or outer_frame is None:
+            return None
+
+        inner_file_name, inner_func_name, inner_line_no = inner_frame
+        outer_file_name, outer_func_name, outer_line_no = outer_frame
+        inner_file_name = inner_file_name[len(project_root_prefix) :]
+        outer_file_name = outer_file_name[len(project_root_prefix) :]
+
+        return (
+            f"/* inner_func:{inner_func_name}, inner_line:{inner_file_name}:{inner_line_no},"
+            f" outer_func:{outer_func_name}, outer_line:{outer_file_name}:{outer_line_no} */ "
+        )
+
+    @staticmethod
+    def compile_query_with_comments(query_compile: Callable, comment: str, *args: Any, **kwargs: Any) -> Any:
+        compile_result = query_compile(*args, **kwargs)
+        compile_result.string = f"{comment}{compile_result.string}"
 
         return compile_result
 
+    def tag_query(self, query: Union[str, "ClauseElement"]) -> Union[str, "ClauseElement"]:
+        if not self.tag_sql_queries or isinstance(query, str):
+            return query
+
+        comment = self.get_query_comment(self.project_root_prefix)
+
+        if comment is None:
+            return query
+
+        # shallow copy, query passed by caller can be reused and must stay untouched
+        tagged_query = query._generate()  # type: ignore
+        tagged_query.compile = partial(self.compile_query_with_comments, query.compile, comment)
+
+        return tagged_query
+
     async def fetch_one(self, query: Union[str, "ClauseElement"], values: Optional[dict] = None) -> Optional[Mapping]:
         await self.connect()
 
-        if self.tag_sql_queries:
-            query.sqlalchemy_compile = query.compile  # type: ignore
-            query.compile = partial(  # type: ignore
-                self.compile_query_with_comments, query, self.project_root_dir
-            )
-
-        return await self.pool.fetch_one(query, values)  # type: ignore
+        return await self.pool.fetch_one(self.tag_query(query), values)  # type: ignore
 
     async def fetch_all(self, query: Union[str, "ClauseElement"], values: Optional[dict] = None) -> List[Mapping]:
         await self.connect()
 
-        if self.tag_sql_queries:
-            query.sqlalchemy_compile = query.compile  # type: ignore
-            query.compile = partial(  # type: ignore
-                self.compile_query_with_comments, query, self.project_root_dir
-            )
-
-        return await self.pool.fetch_all(query, values)  # type: ignore
+        return await self.pool.fetch_all(self.tag_query(query), values)  # type: ignore
@@ -1,10 +1,10 @@
-from collections import Counter
-from contextvars import ContextVar
-from typing import TYPE_CHECKING, Any
+from contextvars import ContextVar, Token
+from typing import TYPE_CHECKING, Any, Optional
 
 from databases.core import Transaction
 
-ON_TRANSACTION: ContextVar[Counter] = ContextVar("on-transaction-state", default=Counter())
+# transactions depth of all database backends, per backend depth is stored in DatabaseBackend.transaction_depth
+ON_TRANSACTION: ContextVar[int] = ContextVar("on-transaction-state", default=0)
 
 if TYPE_CHECKING:
     from scrudge_orm.backends.base import DatabaseBackend
@@ -17,7 +17,9 @@ class PatchedTransaction(Transaction):
         *args: Any,
         **kwargs: Any,
     ) -> None:
-        self.__database_backend_id = id(database)
+        self.__transaction_depth = database.transaction_depth
+        self.__depth_token: Optional[Token[int]] = None
+        self.__total_depth_token: Optional[Token[int]] = None
         super().__init__(*args, **kwargs)
 
     async def __aenter__(self) -> "Transaction":
@@ -26,9 +28,8 @@ class PatchedTransaction(Transaction):
         """
         transaction = await super().__aenter__()
 
-        transaction_counter = ON_TRANSACTION.get()
-        transaction_counter[self.__database_backend_id] += 1
-        ON_TRANSACTION.set(transaction_counter)
+        self.__depth_token = self.__transaction_depth.set(self.__transaction_depth.get() + 1)
+        self.__total_depth_token = ON_TRANSACTION.set(ON_TRANSACTION.get() + 1)
 
         return transaction
 
@@ -36,8 +37,10 @@ class PatchedTransaction(Transaction):
         """
         Called when exiting `async with database.transaction()`
         """
-        await super().__aexit__(*args, **kwargs)
-
-        transaction_counter = ON_TRANSACTION.get()
-        transaction_counter[self.__database_backend_id] -= 1
-        ON_TRANSACTION.set(transaction_counter)
+        try:
+            await super().__aexit__(*args, **kwargs)
+        finally:
+            if self.__depth_token is not None and self.__total_depth_token is not None:
+                self.__transaction_depth.reset(self.__depth_token)
+                ON_TRANSACTION.reset(self.__total_depth_token)
+                self.__depth_token, self.__total_depth_token = None, None
@@ -1,15 +1,451 @@
-from typing import Any
+from logging import DEBUG
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple, Union
+
+from databases.backends.postgres import PostgresConnection, Record, logger
+from databases.core import LOG_EXTRA
+from sqlalchemy.sql import ClauseElement, Insert
 
 from scrudge_orm.backends.base import DatabaseBackend, DatabaseSettings
 from scrudge_orm.backends.consts import SupportedPGDriver
+from scrudge_orm.utils.iterables import paginate
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Compiled
+
+# compiled statement, sorted parameter names, query string, result columns with column maps for records
+CompiledQuery = Tuple["Compiled", Tuple[str, ...], str, Tuple]
+# compiled query and (column, parameter name) pairs of every inserted row
+CompiledInsertValues = Tuple[CompiledQuery, Tuple[Tuple[Tuple[str, str], ...], ...]]
 
 
 class PGDatabaseSettings(DatabaseSettings):
     driver: SupportedPGDriver
 
+    # asyncpg pool options, asyncpg defaults are used if not provided
+    max_queries: Optional[int] = None
+    max_inactive_connection_lifetime: Optional[float] = None
+
+    def get_pool_options(self) -> Dict[str, Any]:
+        return self.model_dump(include={"max_queries", "max_inactive_connection_lifetime"}, exclude_none=True)
+
+
+class ColumnDefaultContext:
+    """
+    Execution context for python side column defaults, that are applied to rows before COPY
+    """
+
+    __slots__ = ("current_parameters",)
+
+    def __init__(self, current_parameters: Dict[str, Any]) -> None:
+        self.current_parameters = current_parameters
+
+    def get_current_parameters(self, isolate_multiinsert_groups: bool = True) -> Dict[str, Any]:
+        return self.current_parameters
+
 
 class PGDatabaseBackend(DatabaseBackend):
+    __slots__ = ("is_asyncpg_backend", "compiled_queries", "compiled_queries_max_size")
+
+    supports_array_comparison = True
+
     def __init__(
         self, settings: PGDatabaseSettings, project_root_dir: str, tag_sql_queries: bool = False, **kwargs: Any
     ) -> None:
-        super().__init__(settings, project_root_dir, tag_sql_queries=tag_sql_queries, **kwargs)
+        # databases passes unknown options to asyncpg.create_pool
+        pool_options = settings.get_pool_options() if settings.driver == SupportedPGDriver.ASYNC_PG else {}
+        pool_options.update(kwargs)
+
+        super().__init__(settings, project_root_dir, tag_sql_queries=tag_sql_queries, **pool_options)
+        self.is_asyncpg_backend = settings.driver == SupportedPGDriver.ASYNC_PG
+        # statements of bulk operations have the same shape for every full batch
+        self.compiled_queries: Dict[Hashable, Any] = {}
+        self.compiled_queries_max_size = 256
+
+    def compile_for_asyncpg(self, query: "ClauseElement") -> Tuple["Compiled", Tuple[str, ...], str]:
+        """
+        Compile query with asyncpg placeholders
+        :param query: sqlalchemy query
+        :return: compiled query, sorted names of parameters and query string with $N placeholders
+        """
+        compiled = query.compile(
+            dialect=self.pool._backend._dialect,
+            compile_kwargs={"render_postcompile": True},
+        )
+        param_names = tuple(sorted(compiled.params))
+        query_str = compiled.string % {key: f"${index}" for index, key in enumerate(param_names, start=1)}
+
+        return compiled, param_names, query_str
+
+    @staticmethod
+    def get_positional_args(
+        compiled: "Compiled", param_names: Tuple[str, ...], values: Optional[Dict] = None
+    ) -> List[Any]:
+        params = compiled.construct_params(values)
+        processors = compiled._bind_processors  # type: ignore
+
+        return [processors[key](params[key]) if key in processors else params[key] for key in param_names]
+
+    @staticmethod
+    def have_same_keys(values: List[Dict]) -> bool:
+        """
+        Check, that statement compiled for the first values mapping fits all of them
+        :param values: list of dictionaries with query parameters
+        :return: True if all dictionaries have the same keys
+        """
+        first_keys = values[0].keys()
+
+        return all(row.keys() == first_keys for row in values)
+
+    def compile_execute_many_query(self, query: "ClauseElement", values: List) -> Tuple[str, List[List]]:
+        """
+        Compile query once for all values and convert every values mapping to positional arguments
+        :param query: sqlalchemy query, values of the first row define the statement columns
+        :param values: list of dictionaries with query parameters, all of them should have the same keys
+        :return: query string with asyncpg placeholders and list of positional arguments for each row
+        """
+        # parameters of other rows would be silently replaced by values of the first row
+        assert self.have_same_keys(values), "all values should have the same keys"
+
+        compiled, param_names, query_str = self.compile_for_asyncpg(query.values(**values[0]))  # type: ignore
+
+        return query_str, [self.get_positional_args(compiled, param_names, row) for row in values]
+
+    def compile_multi_values_insert_query(self, query: "Insert", values: List[Dict]) -> Tuple[str, List]:
+        """
+        Compile single INSERT ... VALUES (...), (...) statement for all values
+        :param query: sqlalchemy insert query
+        :param values: list of dictionaries with rows to insert, all of them should have the same keys
+        :return: query string with asyncpg placeholders and flat list of positional arguments
+        """
+        assert self.have_same_keys(values), "all values should have the same keys"
+
+        compiled, param_names, query_str = self.compile_for_asyncpg(query.values(values))
+
+        return query_str, self.get_positional_args(compiled, param_names)
+
+    def get_or_compile(self, cache_key: Hashable, compile_query: Callable[[], Any]) -> Any:
+        """
+        Returns compiled query data from LRU cache, compile_query is called on cache miss
+        :param cache_key: key describing shape of statement
+        :param compile_query: function to compile statement
+        :return: result of compile_query
+        """
+        if cache_key in self.compiled_queries:
+            # move to the end, the first key is the least recently used
+            cached = self.compiled_queries[cache_key] = self.compiled_queries.pop(cache_key)
+            return cached
+
+        compiled_query = compile_query()
+
+        if len(self.compiled_queries) >= self.compiled_queries_max_size:
+            self.compiled_queries.pop(next(iter(self.compiled_queries)))
+
+        self.compiled_queries[cache_key] = compiled_query
+
+        return compiled_query
+
+    def compile_with_result_columns(self, query: "ClauseElement") -> CompiledQuery:
+        compiled, param_names, query_str = self.compile_for_asyncpg(query)
+        result_columns = compiled._result_columns  # type: ignore
+
+        return (
+            compiled,
+            param_names,
+            query_str,
+            (result_columns, PostgresConnection._create_column_maps(result_columns)),
+        )
+
+    def compile_insert_values(self, query: "Insert", values: List[Dict]) -> Optional[CompiledInsertValues]:
+        """
+        Compile multi-row insert statement, that can be reused for other rows with the same columns
+        :param query: sqlalchemy insert query without values, returning part is allowed
+        :param values: list of dictionaries with rows to insert
+        :return: compiled statement data or None if statement can't be reused for other values
+        """
+        # compile with empty values, cached statement must not hold references to rows data
+        compiled_query = self.compile_with_result_columns(
+            query.values([dict.fromkeys(values[0]) for _ in range(len(values))])
+        )
+        row_param_names = tuple(
+            tuple((column_key, f"{column_key}_m{index}") for column_key in values[0]) for index in range(len(values))
+        )
+
+        # sqlalchemy names parameters of multi-row insert as <column>_m<row index>
+        if not all(name in compiled_query[0].params for row_names in row_param_names for _, name in row_names):
+            return None
+
+        return compiled_query, row_param_names
+
+    def get_compiled_query_str_and_args(self, compiled_query: CompiledQuery, params: Dict) -> Tuple[str, List]:
+        compiled, param_names, query_str, _ = compiled_query
+        args = self.get_positional_args(compiled, param_names, params)
+
+        if self.tag_sql_queries and (comment := self.get_query_comment(self.project_root_prefix)) is not None:
+            query_str = f"{comment}{query_str}"
+
+        # the same log record as databases writes for queries executed by it
+        if logger.isEnabledFor(DEBUG):
+            query_message = query_str.replace(" \n", " ").replace("\n", " ")
+            logger.debug("Query: %s Args: %s", query_message, repr(tuple(args)), extra=LOG_EXTRA)
+
+        return query_str, args
+
+    async def fetch_all_compiled(self, compiled_query: CompiledQuery, params: Dict) -> List[Mapping]:
+        """
+        Fetch rows of already compiled query
+        :param compiled_query: compiled query data
+        :param params: values of query parameters
+        :return: rows wrapped into databases records, so result processors are applied
+        """
+        query_str, args = self.get_compiled_query_str_and_args(compiled_query, params)
+        result_columns, column_maps = compiled_query[3]
+
+        await self.connect()
+
+        # databases lock serializes queries of connection shared by tasks of one transaction
+        async with self.pool.connection() as connection, connection._query_lock:
+            rows = await connection.raw_connection.fetch(query_str, *args)
+
+        dialect = self.pool._backend._dialect
+
+        return [Record(row, result_columns, dialect, column_maps) for row in rows]  # type: ignore
+
+    async def execute_compiled(self, compiled_query: CompiledQuery, params: Dict) -> None:
+        """
+        Execute already compiled query without fetching rows
+        :param compiled_query: compiled query data
+        :param params: values of query parameters
+        :return: None
+        """
+        query_str, args = self.get_compiled_query_str_and_args(compiled_query, params)
+
+        await self.connect()
+
+        async with self.pool.connection() as connection, connection._query_lock:
+            await connection.raw_connection.execute(query_str, *args)
+
+    async def fetch_all_cached(
+        self, cache_key: Optional[Hashable], build_query: Callable[[Dict], "ClauseElement"], params: Dict
+    ) -> List[Mapping]:
+        """
+        Fetch rows of query, compiled statement is reused for queries with the same cache key
+        :param cache_key: key describing shape of statement, None disables cache
+        :param build_query: function to build query with bind parameters from params
+        :param params: values of query bind parameters
+        :return: rows
+        """
+        if not self.is_asyncpg_backend or cache_key is None:
+            return await super().fetch_all_cached(cache_key, build_query, params)
+
+        # statement is built without values, cached statement must not hold references to rows data
+        compiled_query = self.get_or_compile(
+            ("fetch_all_cached", cache_key), lambda: self.compile_with_result_columns(build_query({}))
+        )
+
+        return await self.fetch_all_compiled(compiled_query, params)
+
+    def prepare_insert_values(
+        self, query: "Insert", values: List[Dict], cache_key: Optional[Hashable] = None
+    ) -> Optional[Tuple[CompiledQuery, Dict]]:
+        """
+        Get compiled multi-row insert statement from cache and its parameters for values
+        :param query: sqlalchemy insert query without values, returning and on conflict parts are allowed
+        :param values: list of dictionaries with rows to insert
+        :param cache_key: key describing shape of on conflict part, required to cache insert with on conflict part
+        :return: compiled query with parameters or None if compiled statement can't be used for values
+        """
+        if cache_key is None and self.is_plain_insert(query, allow_returning=True):
+            cache_key = (query.table, query._returning)  # type: ignore
+
+        if (
+            not self.is_asyncpg_backend
+            or not values
+            or cache_key is None
+            or query.select is not None
+            or any(
+                row.keys() != values[0].keys() or any(isinstance(value, ClauseElement) for value in row.values())
+                for row in values
+            )
+        ):
+            return None
+
+        compiled_insert_values = self.get_or_compile(
+            ("insert_values", cache_key, tuple(values[0]), len(values)),
+            lambda: self.compile_insert_values(query, values),
+        )
+
+        if compiled_insert_values is None:
+            return None
+
+        compiled_query, row_param_names = compiled_insert_values
+        params = {
+            name: row[column_key] for row, row_names in zip(values, row_param_names) for column_key, name in row_names
+        }
+
+        return compiled_query, params
+
+    async def fetch_all_insert_values(
+        self, query: "Insert", values: List[Dict], cache_key: Optional[Hashable] = None
+    ) -> List[Mapping]:
+        """
+        Insert several rows with one statement. Statement is compiled once for rows with the same columns
+        :param query: sqlalchemy insert query without values, returning and on conflict parts are allowed
+        :param values: list of dictionaries with rows to insert
+        :param cache_key: key describing shape of on conflict part, insert with on conflict part is cached by it only
+        :return: rows from returning part
+        """
+        prepared = self.prepare_insert_values(query, values, cache_key)
+
+        if prepared is None:
+            return await super().fetch_all_insert_values(query, values, cache_key)
+
+        return await self.fetch_all_compiled(*prepared)
+
+    async def execute_insert_values(self, query: "Insert", values: List[Dict]) -> None:
+        """
+        Insert several rows with one statement without fetching result.
+        Statement is compiled once for rows with the same columns
+        :param query: sqlalchemy insert query without values and returning part
+        :param values: list of dictionaries with rows to insert
+        :return: None
+        """
+        prepared = self.prepare_insert_values(query, values)
+
+        if prepared is None:
+            return await super().execute_insert_values(query, values)
+
+        return await self.execute_compiled(*prepared)
+
+    @staticmethod
+    def is_plain_insert(query: "ClauseElement", allow_returning: bool = False) -> bool:
+        """
+        Plain insert has no returning, on conflict or insert from select parts, so it can be replaced by COPY
+        :param query: sqlalchemy query
+        :param allow_returning: treat insert with returning part as plain
+        :return: True if insert is plain
+        """
+        return (
+            isinstance(query, Insert)
+            and query.select is None
+            and (allow_returning or not query._returning)  # type: ignore
+            and getattr(query, "_post_values_clause", None) is None
+        )
+
+    def prepare_copy_records(
+        self, query: "Insert", values: List[Dict]
+    ) -> Optional[Tuple[Tuple[str, ...], List[Tuple]]]:
+        """
+        Convert values to records for COPY. Python side defaults of missing columns are applied like sqlalchemy
+        does for insert query, bind processors are applied too
+        :param query: sqlalchemy plain insert query
+        :param values: list of dictionaries with rows to insert, all of them should have the same keys
+        :return: column names and records or None if default of missing column is sql expression or sequence
+        """
+        assert self.have_same_keys(values), "all values should have the same keys"
+
+        defaults = [
+            column.default
+            for column in query.table.c  # type: ignore
+            if column.default is not None and column.key not in values[0]
+        ]
+
+        # sql expression defaults are rendered into insert statement, COPY can't apply them
+        if any(not (default.is_scalar or default.is_callable) for default in defaults):
+            return None
+
+        if defaults:
+            values = [self.apply_column_defaults(row, defaults) for row in values]
+
+        compiled, param_names, _ = self.compile_for_asyncpg(query.values(**values[0]))
+        column_names = tuple(query.table.c[key].name for key in param_names)  # type: ignore
+
+        return column_names, [tuple(self.get_positional_args(compiled, param_names, row)) for row in values]
+
+    @staticmethod
+    def apply_column_defaults(row: Dict, defaults: List[Any]) -> Dict:
+        """
+        Add values of python side column defaults to row
+        :param row: dictionary with row to insert
+        :param defaults: scalar or callable defaults of columns missing in row
+        :return: new dictionary with row and defaults values
+        """
+        row_with_defaults = dict(row)
+        context = ColumnDefaultContext(row_with_defaults)
+
+        for default in defaults:
+            # sqlalchemy wraps callables without arguments, so all of them get execution context
+            row_with_defaults[default.column.key] = default.arg if default.is_scalar else default.arg(context)
+
+        return row_with_defaults
+
+    async def copy_records_to_table(
+        self,
+        table_name: str,
+        records: Iterable[Tuple],
+        columns: Optional[Iterable[str]] = None,
+        schema_name: Optional[str] = None,
+    ) -> str:
+        """
+        Copy records to table using COPY protocol, it's the fastest way to insert big amount of rows
+        :param table_name: name of table to copy records to
+        :param records: tuples with values in columns order
+        :param columns: column names, all table columns if not provided
+        :param schema_name: table schema name
+        :return: status of COPY command
+        """
+        await self.connect()
+
+        async with self.pool.connection() as connection, connection._query_lock:
+            return await connection.raw_connection.copy_records_to_table(
+                table_name, records=records, columns=columns, schema_name=schema_name
+            )
+
+    async def execute_many(
+        self, query: Union[str, "ClauseElement"], values: List, page_size: int = 500, copy_threshold: int = 5000
+    ) -> Any:
+        """
+        Execute query for every values mapping.
+        Plain insert queries with at least copy_threshold rows are executed with COPY,
+        other insert queries are sent as one multi-row statement per page, the rest are pipelined by asyncpg
+        :param query: sqlalchemy query or raw sql string
+        :param values: list of dictionaries with query parameters
+        :param page_size: amount of rows in one multi-row insert statement
+        :param copy_threshold: min amount of rows to use COPY for plain insert queries
+        :return: None
+        """
+        # databases executes queries one by one, asyncpg can pipeline them with a single sync
+        if not self.is_asyncpg_backend or isinstance(query, str) or not values:
+            return await super().execute_many(query, values)
+
+        # statement is compiled once for all rows, rows with other keys are compiled one by one
+        if not self.have_same_keys(values):
+            return await super().execute_many(query, values)
+
+        if (
+            len(values) >= copy_threshold
+            and self.is_plain_insert(query)
+            and (copy_records := self.prepare_copy_records(query, values)) is not None  # type: ignore
+        ):
+            columns, records = copy_records
+            await self.copy_records_to_table(
+                query.table.name,  # type: ignore
+                records,
+                columns=columns,
+                schema_name=query.table.schema,  # type: ignore
+            )
+            return None
+
+        await self.connect()
+
+        async with self.pool.connection() as connection:
+            if not isinstance(query, Insert):
+                query_str, args = self.compile_execute_many_query(query, values)
+
+                async with connection._query_lock:
+                    return await connection.raw_connection.executemany(query_str, args)
+
+            # like databases iterate, lock is taken inside transaction, so pages aren't interleaved with other queries
+            async with connection.transaction(), connection._query_lock:
+                for page in paginate(values, page_size):
+                    query_str, flat_args = self.compile_multi_values_insert_query(query, page)
+                    await connection.raw_connection.execute(query_str, *flat_args)
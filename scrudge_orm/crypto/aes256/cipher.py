@@ -1,42 +1,76 @@
-import base64
+import binascii
 import hashlib
+import os
+from functools import lru_cache
 from typing import Union
 
-from Crypto import Random
-from Crypto.Cipher import AES
+AES_BLOCK_SIZE = 16
 
 
 class AESCipher:
     def __init__(self, key: str):
+        # cryptography is loaded on the first cipher creation, processes without encrypted fields don't pay for it
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        self._cipher_cls = Cipher
+        self._cbc_mode = modes.CBC
         self.key = hashlib.sha256(key.encode()).digest()
+        # key schedule is computed once, only CBC mode with fresh iv is created per call
+        self._alg = algorithms.AES(self.key)
 
-    def encrypt_raw(self, plain: Union[bytes, str]) -> bytes:
+    def encrypt_raw_binary(self, plain: Union[bytes, str]) -> bytes:
+        """
+        Encrypt value without base64 encoding, suitable for binary columns
+        :param plain: value to encrypt
+        :return: iv + ciphertext
+        """
         plain_bytes = self._pad(plain)
-        iv = Random.new().read(AES.block_size)
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
-        return base64.b64encode(iv + cipher.encrypt(plain_bytes))
+        iv = os.urandom(AES_BLOCK_SIZE)
+        encryptor = self._cipher_cls(self._alg, self._cbc_mode(iv)).encryptor()
+        return iv + encryptor.update(plain_bytes) + encryptor.finalize()
+
+    def encrypt_raw(self, plain: Union[bytes, str]) -> bytes:
+        return binascii.b2a_base64(self.encrypt_raw_binary(plain), newline=False)
 
     def encrypt(self, plain: str) -> str:
         return self.encrypt_raw(plain).decode("utf-8")
 
+    def decrypt_raw_binary(self, encrypted: bytes) -> bytes:
+        """
+        Decrypt value encrypted by encrypt_raw_binary
+        :param encrypted: iv + ciphertext
+        :return: decrypted value
+        """
+        iv = encrypted[:AES_BLOCK_SIZE]
+        decryptor = self._cipher_cls(self._alg, self._cbc_mode(iv)).decryptor()
+        return self._unpad(decryptor.update(encrypted[AES_BLOCK_SIZE:]) + decryptor.finalize())
+
     def decrypt_raw(self, encrypted: Union[bytes, str]) -> bytes:
-        encrypted_bytes = base64.b64decode(encrypted)
-        iv = encrypted_bytes[: AES.block_size]
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
-        return self._unpad(cipher.decrypt(encrypted_bytes[AES.block_size :]))
+        return self.decrypt_raw_binary(binascii.a2b_base64(encrypted))
 
     def decrypt(self, encrypted: Union[bytes, str]) -> str:
         return self.decrypt_raw(encrypted).decode("utf-8")
 
     @staticmethod
     def _pad(s: Union[str, bytes]) -> bytes:
-        bs = AES.block_size
-
         if isinstance(s, str):
             s = s.encode()
 
-        return s + (bs - len(s) % bs) * (chr(bs - len(s) % bs).encode())
+        # block size is a power of two, so bitwise and is the same as modulus
+        pad_len = AES_BLOCK_SIZE - (len(s) & (AES_BLOCK_SIZE - 1))
+
+        return s + bytes((pad_len,)) * pad_len
 
     @staticmethod
     def _unpad(s: bytes) -> bytes:
-        return s[: -ord(s[len(s) - 1 :])]
+        return s[: -s[-1]]
+
+
+@lru_cache
+def get_cipher(key: str) -> AESCipher:
+    """
+    Returns shared cipher instance for the key
+    :param key: AES encryption key
+    :return: AESCipher instance
+    """
+    return AESCipher(key)
@@ -1,12 +1,13 @@
 import sys
 from typing import Callable, Self, Type, Union
 
-from scrudge_orm.crypto.aes256.cipher import AESCipher
+from scrudge_orm.crypto.aes256.cipher import AESCipher, get_cipher
 
 
 class AES256EncryptedField:
     cipher: AESCipher
     start_sequence: Union[str, bytes]
+    _prefix_len: int
 
     def __new__(cls, value: Union[str, bytes]) -> "Self":
         # value will be decrypted on instance creation process if it's encrypted
@@ -22,9 +23,10 @@ class AES256EncryptedField:
 
     @classmethod
     def decrypt_value(cls, value: Union[bytes, str, Self]) -> Self:
-        if value.startswith(cls.start_sequence):  # type: ignore
+        # fixed length slice comparison is cheaper than startswith for short prefixes
+        if value[: cls._prefix_len] == cls.start_sequence:  # type: ignore
             try:
-                final_value = cls.get_decrypt_function()(value[7:])  # type: ignore
+                final_value = cls.get_decrypt_function()(value[cls._prefix_len :])  # type: ignore
             except (UnicodeDecodeError, ValueError):
                 final_value = value
         else:
@@ -49,7 +51,14 @@ class AES256EncryptedField:
         # need to register class in module due to pickle issues
         module = sys.modules[__name__]
         class_name = f"{cls.__name__}{cls_identifier}"
-        klass = type(class_name, (cls,), {"cipher": AESCipher(aes_key)})
+        cipher = get_cipher(aes_key)
+
+        # ciphers are shared per key, so the registered class is reused on repeated calls with the same key
+        registered = getattr(module, class_name, None)
+        if registered is not None and registered.__bases__ == (cls,) and registered.__dict__.get("cipher") is cipher:
+            return registered
+
+        klass = type(class_name, (cls,), {"cipher": cipher})
         setattr(module, class_name, klass)
 
         return klass
@@ -57,6 +66,7 @@ class AES256EncryptedField:
 
 class AES256EncryptedString(AES256EncryptedField, str):
     start_sequence = "aes256:"
+    _prefix_len = len(start_sequence)
 
     @classmethod
     def get_encrypt_function(cls) -> Callable:
@@ -69,6 +79,7 @@ class AES256EncryptedString(AES256EncryptedField, str):
 
 class AES256EncryptedBytes(AES256EncryptedField, bytes):
     start_sequence = b"aes256:"
+    _prefix_len = len(start_sequence)
 
     @classmethod
     def get_encrypt_function(cls) -> Callable:
@@ -77,3 +88,20 @@ class AES256EncryptedBytes(AES256EncryptedField, bytes):
     @classmethod
     def get_decrypt_function(cls) -> Callable:
         return cls.cipher.decrypt_raw
+
+
+class AES256EncryptedBinary(AES256EncryptedField, bytes):
+    """
+    Stores iv + ciphertext without base64 encoding, use it with binary columns
+    """
+
+    start_sequence = b"aes256b:"
+    _prefix_len = len(start_sequence)
+
+    @classmethod
+    def get_encrypt_function(cls) -> Callable:
+        return cls.cipher.encrypt_raw_binary
+
+    @classmethod
+    def get_decrypt_function(cls) -> Callable:
+        return cls.cipher.decrypt_raw_binary
@@ -1,11 +1,18 @@
 import hashlib
-from typing import Callable, Generic, Self, TypeVar
+from functools import lru_cache
+from typing import Callable, Generic, Iterable, List, Optional, Self, TypeVar
 
 T = TypeVar("T", str, bytes)
 
+# default size of hashes cache, cache is disabled until enable_cache is called
+HASH_CACHE_SIZE = 4096
+
 
 class SHA512EncryptedField(Generic[T]):
     start_sequence: T  # start_sequence is a historic way
+    _prefix_len: int
+    _sha512 = hashlib.sha512
+    _cached_encrypt_function: Optional[Callable] = None
 
     def __new__(cls, value: T) -> "Self":
         # value will be decrypted on instance creation process if it's encrypted
@@ -15,13 +22,39 @@ class SHA512EncryptedField(Generic[T]):
     def _encrypt_function(cls, value: T) -> T:
         raise NotImplementedError()
 
+    @classmethod
+    def enable_cache(cls, maxsize: int = HASH_CACHE_SIZE) -> None:
+        """
+        Cache hashes of repeated values, it's useful for bulk flows with the same not secret values.
+        Cached values are kept in process memory as plain text, so don't enable it for passwords and secrets
+        :param maxsize: max amount of cached values
+        """
+        cls._cached_encrypt_function = lru_cache(maxsize=maxsize)(cls._encrypt_function)
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        """
+        Disable cache of hashed values, cached values are dropped
+        """
+        cls.cache_clear()
+        cls._cached_encrypt_function = None
+
+    @classmethod
+    def cache_clear(cls) -> None:
+        """
+        Clear cache of hashed values
+        """
+        if cls._cached_encrypt_function is not None:
+            cls._cached_encrypt_function.cache_clear()  # type: ignore
+
     @classmethod
     def get_encrypt_function(cls) -> Callable:
-        return cls._encrypt_function
+        return cls._cached_encrypt_function or cls._encrypt_function
 
     @classmethod
     def encrypt_value(cls, value: T) -> T:
-        if not value.startswith(cls.start_sequence):
+        # fixed length slice comparison is cheaper than startswith for short prefixes
+        if value[: cls._prefix_len] != cls.start_sequence:
             try:
                 final_value = cls.get_encrypt_function()(value)
             except (UnicodeDecodeError, ValueError):
@@ -31,21 +64,34 @@ class SHA512EncryptedField(Generic[T]):
 
         return final_value
 
+    @classmethod
+    def encrypt_many(cls, values: Iterable[T]) -> List[T]:
+        """
+        Encrypt several values at once, useful for bulk flows
+        :param values: values to encrypt, already encrypted values will be returned as is
+        :return: list of encrypted values
+        """
+        encrypt_value = cls.encrypt_value
+
+        return [encrypt_value(value) for value in values]
+
     def encrypt(self) -> T:
         return self.encrypt_value(self)  # type: ignore
 
 
 class SHA512EncryptedString(SHA512EncryptedField, str):
     start_sequence = "sha512:"
+    _prefix_len = len(start_sequence)
 
     @classmethod
     def _encrypt_function(cls, value: str) -> str:
-        return cls.start_sequence + hashlib.sha512(value.encode("utf-8")).hexdigest()
+        return cls.start_sequence + cls._sha512(value.encode("utf-8"), usedforsecurity=False).hexdigest()
 
 
 class SHA512EncryptedBytes(SHA512EncryptedField, bytes):
     start_sequence = b"sha512:"
+    _prefix_len = len(start_sequence)
 
     @classmethod
     def _encrypt_function(cls, value: bytes) -> bytes:
-        return cls.start_sequence + hashlib.sha512(value).digest()
+        return cls.start_sequence + cls._sha512(value, usedforsecurity=False).digest()
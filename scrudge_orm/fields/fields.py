@@ -12,7 +12,7 @@ from scrudge_orm.serialization.base_serializer_fields import (
     PrefetchFieldOneToOne,
 )
 from scrudge_orm.utils.imports import lazy_import
-from scrudge_orm.utils.sqalchemy import find_foreign_key_relation
+from scrudge_orm.utils.sqalchemy import copy_column, find_foreign_key_relation
 
 if TYPE_CHECKING:
     from scrudge_orm.models.base import DatabaseModel
@@ -70,6 +70,13 @@ class DatabaseWithValidationField(BaseModel):
 
         return self._to_manager
 
+    def __copy__(self) -> "DatabaseWithValidationField":
+        copied = super().__copy__()
+        # column can't be shared between tables
+        copied.__dict__["sqlalchemy_column"] = copy_column(self.sqlalchemy_column)
+
+        return copied
+
     def get_typing(self) -> Any:
         return self.to_model
 
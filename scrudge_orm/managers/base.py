@@ -1,29 +1,55 @@
+from contextlib import AbstractAsyncContextManager, nullcontext
 from enum import Enum
-from functools import cached_property
-from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Type, Union
+from functools import lru_cache, partial
+from operator import attrgetter, methodcaller
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
 from pydantic import BaseModel
 from sqlalchemy import (  # type: ignore
     Column,
+    bindparam,
     cast,
     insert,
     select,
     values,
 )
 from sqlalchemy import update as sa_update
+from sqlalchemy.sql import ClauseElement
 
 from scrudge_orm.crypto.aes256.encrypted_field import AES256EncryptedField
 from scrudge_orm.managers.set_functions import BaseSetFunction
 from scrudge_orm.query.conditions import AndCondition, F, OrCondition
 from scrudge_orm.query.functions import BaseFunction
 from scrudge_orm.query.queryset import QuerySet, RawQuerySet
+from scrudge_orm.utils.iterables import paginate
 from scrudge_orm.utils.sqalchemy import find_foreign_key_relation
+from scrudge_orm.utils.typehint import is_any_of
 
 if TYPE_CHECKING:
     from sqlalchemy import Table
-    from sqlalchemy.sql import ClauseElement, ColumnElement
+    from sqlalchemy.sql import ColumnElement, Update
+    from sqlalchemy.sql.elements import Label
 
     from scrudge_orm.backends.base import DatabaseBackend
+    from scrudge_orm.backends.patched_transaction import PatchedTransaction
     from scrudge_orm.fields.fields import ManyToManyRelationField, OneToManyRelationField
     from scrudge_orm.models.base import DatabaseModel, DatabaseModelTypeVar
 
@@ -34,35 +60,88 @@ class DatabaseManager:
         self.model = model
         self.pool = pool
 
-    @cached_property
-    def get_table_columns_with_defaults(self) -> Tuple["Column", ...]:
-        return tuple(
-            col for col in self.table.c if col.onupdate is not None or col.server_default is not None or col.primary_key
+        # table never changes for manager, so columns info is collected once
+        self._table_col_names: FrozenSet[str] = frozenset(table.c.keys())
+        self._all_columns: Tuple["Column", ...] = tuple(table.c)
+        # the same returning columns are passed on every call of the same code path
+        self._resolve_returning = lru_cache(maxsize=32)(self.resolve_returning_columns)
+        # labels are immutable, the same labeled columns keep plans of querysets with joins cacheable
+        self._labeled_columns = lru_cache(maxsize=32)(self.label_columns)
+        self._cols_with_defaults: Tuple["Column", ...] = tuple(
+            col for col in table.c if col.onupdate is not None or col.server_default is not None or col.primary_key
+        )
+        self._cols_with_server_defaults: Tuple["Column", ...] = tuple(
+            col for col in table.c if col.server_default is not None or col.primary_key
         )
+        self._onupdate_defaults: Dict[str, Any] = {
+            col.name: col.onupdate.arg for col in table.c if col.onupdate is not None
+        }
+        self._server_default_names: FrozenSet[str] = frozenset(
+            col.name for col in table.c if col.server_default is not None
+        )
+        self._pk_names: FrozenSet[str] = frozenset(col.name for col in table.c if col.primary_key)
+        # database generates values for these columns if they are not provided
+        self._skip_if_none_names: Tuple[str, ...] = tuple(self._pk_names | self._server_default_names)
+        self._converters: Dict[type, Optional[Callable[[Any], Any]]] = {}
+        self._dump_by_dict: Optional[bool] = None
+
+    @property
+    def get_table_columns_with_defaults(self) -> Tuple["Column", ...]:
+        return self._cols_with_defaults
 
-    @cached_property
+    @property
     def get_table_columns_with_server_defaults(self) -> Tuple["Column", ...]:
-        return tuple(col for col in self.table.c if col.server_default is not None or col.primary_key)
+        return self._cols_with_server_defaults
 
-    @cached_property
+    @property
     def get_table_onupdate_defaults(self) -> Dict[str, Any]:
-        return {col.name: col.onupdate.arg for col in self.table.c if col.onupdate is not None}
+        return self._onupdate_defaults
+
+    def get_raw_value_converter(self, value_type: type) -> Optional[Callable[[Any], Any]]:
+        """
+        Find function to convert values of the type to raw database values
+        :param value_type: type of value
+        :return: converter or None if values of the type don't need conversion
+        """
+        converter: Optional[Callable[[Any], Any]] = None
+
+        if issubclass(value_type, AES256EncryptedField):
+            converter = value_type.encrypt
+        elif issubclass(value_type, Enum):
+            converter = attrgetter("value")
+        elif issubclass(value_type, BaseModel):
+            converter = value_type.model_dump
+        elif issubclass(value_type, (F, BaseFunction)):
+            converter = methodcaller("get_expression", self.table)
+
+        return converter
 
     def convert_value_to_raw(self, value: Any) -> Any:
-        result: Any = value
+        value_type = type(value)
 
-        if isinstance(value, AES256EncryptedField):
-            result = value.encrypt()
-        elif isinstance(value, Enum):
-            result = value.value
-        elif isinstance(value, BaseModel):
-            result = value.model_dump()
-        elif isinstance(value, F):
-            result = value.get_expression(self.table)
-        elif isinstance(value, BaseFunction):
-            result = value.get_expression(self.table)
+        # isinstance chain is resolved once per value type
+        try:
+            converter = self._converters[value_type]
+        except KeyError:
+            converter = self._converters[value_type] = self.get_raw_value_converter(value_type)
 
-        return result
+        return value if converter is None else converter(value)
+
+    @staticmethod
+    def resolve_set_functions(set_functions: Optional[Dict[str, str]]) -> Dict[str, BaseSetFunction]:
+        """
+        Find set function instances once per call, not for every column of every batch
+        :param set_functions: column name to set function name mapping
+        :return: column name to set function instance mapping
+        """
+        if not set_functions:
+            return {}
+
+        return {
+            col_name: BaseSetFunction.get_instance_by_name(set_func_name)
+            for col_name, set_func_name in set_functions.items()
+            if set_func_name
+        }
 
     def parse_returning_argument(
         self, returning: Optional[Union[Literal["*"] | Iterable[Union["str", "Column"]]]] = None
@@ -71,39 +150,118 @@ class DatabaseManager:
             return None
 
         if returning == "*":
-            return tuple(self.table.c)
+            return self._all_columns
+
+        return self._resolve_returning(tuple(returning))
 
+    def resolve_returning_columns(self, returning: Tuple[Union[str, "Column"], ...]) -> Tuple["Column", ...]:
         return tuple(item if isinstance(item, Column) else self.table.c[item] for item in returning)
 
+    def get_labeled_columns(self, prefix: str) -> Tuple["Label", ...]:
+        """
+        Table columns labeled as <prefix>.<column name> to select them together with columns of other tables
+        :param prefix: name of joined model, nested models are separated by dot
+        :return: labeled columns in table columns order
+        """
+        return self._labeled_columns(prefix)
+
+    def label_columns(self, prefix: str) -> Tuple["Label", ...]:
+        return tuple(col.label(f"{prefix}.{col.name}") for col in self.table.c)
+
+    @staticmethod
+    def has_nested_models(annotation: Any) -> bool:
+        origin = get_origin(annotation)
+
+        if origin is None:
+            return False
+
+        if origin is Union or origin is Annotated:
+            return any(DatabaseManager.has_nested_models(arg) for arg in get_args(annotation))
+
+        return any(is_any_of(arg, BaseModel) for arg in get_args(annotation))
+
+    def can_dump_by_dict(self) -> bool:
+        """
+        Check if model instance __dict__ gives the same data as model_dump, it's much faster.
+        Resolved on the first call, forward references are already resolved at that moment
+        :return: True if __dict__ can be used instead of model_dump
+        """
+        if self._dump_by_dict is None:
+            related_field_names = self.model.related_field_names
+            decorators = self.model.__pydantic_decorators__
+
+            self._dump_by_dict = (
+                not self.model.model_computed_fields
+                and not decorators.field_serializers
+                and not decorators.model_serializers
+                and not any(
+                    field.exclude or self.has_nested_models(field.annotation)
+                    for name, field in self.model.model_fields.items()
+                    if name not in related_field_names
+                )
+            )
+
+        return self._dump_by_dict
+
     def to_database_data(self, data: Union[Dict, "DatabaseModelTypeVar"]) -> Dict:
         assert isinstance(data, (dict, self.model)), f"'data' should be instance of 'dict' or {self.model}"
 
-        dicted_data: Dict = (
-            data.model_dump(exclude=self.model.related_fields.keys())  # type: ignore
-            if isinstance(data, self.model)
-            else data
-        )
+        if not isinstance(data, self.model):
+            dicted_data: Dict = data  # type: ignore
+        elif self.can_dump_by_dict():
+            related_field_names = self.model.related_field_names
+            dicted_data = {k: v for k, v in data.__dict__.items() if k not in related_field_names}
+        else:
+            dicted_data = data.model_dump(exclude=self.model.related_field_names)  # type: ignore
+
+        table_col_names = self._table_col_names
+        convert_value_to_raw = self.convert_value_to_raw
 
         for k, v in dicted_data.items():
-            try:
-                assert k in self.table.c, f"There is no column '{k}' in table: '{self.table.name}'"
-            except Exception as e:
-                raise e
+            assert k in table_col_names, f"There is no column '{k}' in table: '{self.table.name}'"
 
-            dicted_data[k] = self.convert_value_to_raw(v)
+            dicted_data[k] = convert_value_to_raw(v)
 
         return dicted_data
 
     def get_prepared_to_insert_data(self, data: Union[Dict, "DatabaseModelTypeVar"]) -> Dict:
-        dicted_data = self.to_database_data(data)
+        return self.get_prepared_to_insert_batch((data,))[0]
 
-        for col in self.get_table_columns_with_server_defaults:
-            if (col.primary_key and dicted_data.get(col.name) is None) or (
-                col.server_default is not None and dicted_data.get(col.name) is None
-            ):
-                dicted_data.pop(col.name, None)
+    def get_prepared_to_insert_batch(self, batch: Iterable[Union[Dict, "DatabaseModelTypeVar"]]) -> List[Dict]:
+        """
+        Prepare several objects to insert, columns info and converters are resolved once for the whole batch
+        :param batch: dictionaries with models data or model instances
+        :return: list of dictionaries with raw values, empty columns with database defaults are dropped
+        """
+        to_database_data = self.to_database_data
+        skip_if_none_names = self._skip_if_none_names
+        prepared_batch = []
 
-        return dicted_data
+        for data in batch:
+            dicted_data = to_database_data(data)
+
+            for name in skip_if_none_names:
+                if name in dicted_data and dicted_data[name] is None:
+                    del dicted_data[name]
+
+            prepared_batch.append(dicted_data)
+
+        return prepared_batch
+
+    def convert_rows_to_models(self, rows: Sequence[Mapping]) -> Tuple["DatabaseModelTypeVar", ...]:
+        """
+        Create model instances from database rows
+        :param rows: database rows
+        :return: tuple of model instances, validation is skipped if model Meta.trust_db is set
+        """
+        if self.model.Meta.trust_db:
+            model_construct = self.model.model_construct
+            return tuple(model_construct(**row) for row in rows)  # type: ignore
+
+        # model validator is used directly, so model rebuild is respected and errors have the model locations
+        model_validate = self.model.model_validate
+
+        return tuple(model_validate(dict(row)) for row in rows)  # type: ignore
 
     async def fetch_one(
         self,
@@ -112,7 +270,10 @@ class DatabaseManager:
     ) -> Optional["DatabaseModelTypeVar"]:
         query_result = await self.pool.fetch_one(query, values=values)
 
-        return self.model(**query_result) if query_result is not None else None  # type: ignore
+        if query_result is None:
+            return None
+
+        return self.convert_rows_to_models((query_result,))[0]
 
     async def fetch_all(
         self,
@@ -121,7 +282,7 @@ class DatabaseManager:
     ) -> Tuple["DatabaseModelTypeVar", ...]:
         query_results = await self.pool.fetch_all(query, values=values)
 
-        return tuple(self.model(**row) for row in query_results)  # type: ignore
+        return self.convert_rows_to_models(query_results)
 
     async def create(self, **kwargs: Any) -> "DatabaseModelTypeVar":
         query = (
@@ -131,11 +292,47 @@ class DatabaseManager:
         # will return always DatabaseModel instance or raise different exceptions
         return await self.fetch_one(query)  # type: ignore
 
+    @staticmethod
+    def refresh_from_row(obj: "DatabaseModel", row: Mapping) -> None:
+        """
+        Set values of returned columns to model instance. Values are validated like on assignment,
+        so raw driver values of enums, json models and custom types are converted to field types.
+        Validation is skipped if model Meta.trust_db is set
+        :param obj: model instance
+        :param row: returned database row
+        """
+        # databases record has no items() and its keys() is deprecated,
+        # iteration yields keys and item access applies result processors
+        if obj.Meta.trust_db:
+            values = {name: row[name] for name in row}
+            obj.__dict__.update(values)
+            obj.__pydantic_fields_set__.update(values)
+            return None
+
+        validate_assignment = obj.__pydantic_validator__.validate_assignment
+
+        for name in row:
+            validate_assignment(obj, name, row[name])
+
+    async def get_bulk_transaction(
+        self, transaction: Optional["PatchedTransaction"] = None
+    ) -> Union["PatchedTransaction", AbstractAsyncContextManager]:
+        """
+        Returns context manager for bulk operation
+        :param transaction: already opened transaction, bulk operation joins it instead of opening a nested one
+        :return: new transaction or no-op context manager
+        """
+        if transaction is not None:
+            return nullcontext()
+
+        return await self.pool.transaction()
+
     async def bulk_insert(
         self,
         data: Iterable["DatabaseModelTypeVar"],
         batch_size: int = 1000,
         refresh_auto_fields: bool = True,
+        transaction: Optional["PatchedTransaction"] = None,
     ) -> List["DatabaseModelTypeVar"]:
         """
         Bulk insert model objects to database
@@ -144,60 +341,132 @@ class DatabaseManager:
         :param skip_column_defaults: should insert_objects be updated by column defaults onupdate
         and server_default expressions
         :param refresh_auto_fields: should insert_objects columns with auto defaults be refreshed from database
+        :param transaction: already opened transaction to run in, new transaction is opened if not provided
         :return: inserted objects
         """
-        if not data:
-            return []
-
+        # objects are returned and refreshed, so input is kept in memory anyway
         data_as_list = list(data)
 
+        if not data_as_list:
+            return []
+
         inserted_rows = await self.bulk_insert_raw(
             data_as_list,
             batch_size=batch_size,
-            returning_columns=self.get_table_columns_with_defaults if refresh_auto_fields else None,
+            returning_columns=self._cols_with_defaults if refresh_auto_fields else None,
+            transaction=transaction,
         )
 
         if refresh_auto_fields:
-            for index, row in enumerate(inserted_rows):
-                for k, v in dict(row).items():
-                    setattr(data_as_list[index], k, v)
+            for obj, row in zip(data_as_list, inserted_rows, strict=False):
+                self.refresh_from_row(obj, row)
 
         return data_as_list
 
     async def bulk_insert_raw(
         self,
-        insert_objects: Sequence[Union["DatabaseModelTypeVar", Dict]],
+        insert_objects: Iterable[Union["DatabaseModelTypeVar", Dict]],
         batch_size: int = 1000,
         returning_columns: Optional[Union[Literal["*"] | Iterable[Union["str", "Column"]]]] = None,
+        transaction: Optional["PatchedTransaction"] = None,
     ) -> Any:
         """
         Bulk insert dictionaries with models data or model instances to database.
         This method will be helpful for partial returning inserted data from database.
-        :param insert_objects: list with objects data to insert
+        :param insert_objects: objects data to insert, any iterable is consumed batch by batch
         :param batch_size: an iteration batch size
         :param skip_column_defaults: should columns default values be updated
         by column defaults onupdate and server_default expressions
         :param returning_columns: list of columns to return
+        :param transaction: already opened transaction to run in, new transaction is opened if not provided
         :return: Any, depends on returning
         """
         returning_cols = self.parse_returning_argument(returning_columns)
 
         inserted_objects = []
+        query = insert(self.table)
 
-        async with await self.pool.transaction():
+        if returning_cols:
+            query = query.returning(*returning_cols)
+
+        async with await self.get_bulk_transaction(transaction):
             # can't gather inside transaction
-            for i in range(0, len(insert_objects), batch_size):
-                batch_objects = insert_objects[i : i + batch_size]
-                insert_data = [self.get_prepared_to_insert_data(obj) for obj in batch_objects]
-                query = insert(self.table).values(insert_data)
+            for batch_objects in paginate(insert_objects, batch_size):
+                insert_data = self.get_prepared_to_insert_batch(batch_objects)
 
+                # backend can reuse compiled statement for batches with the same columns
                 if returning_cols:
-                    query = query.returning(*returning_cols)
-
-                inserted_objects.extend(await self.pool.fetch_all(query))
+                    inserted_objects.extend(await self.pool.fetch_all_insert_values(query, insert_data))
+                else:
+                    await self.pool.execute_insert_values(query, insert_data)
 
         return inserted_objects
 
+    def get_bulk_update_query(
+        self,
+        update_col_names: Tuple[str, ...],
+        key_fields: Iterable[str],
+        set_functions: Dict[str, BaseSetFunction],
+        returning_cols: Optional[Tuple["Column", ...]],
+        rows_count: int,
+        params: Dict,
+    ) -> "Update":
+        """
+        Build UPDATE ... FROM (VALUES ...) statement, values are passed as bind parameters
+        :param update_col_names: names of columns in values
+        :param key_fields: names of columns to match rows
+        :param set_functions: column name to set function instance mapping
+        :param returning_cols: columns to return
+        :param rows_count: amount of rows in values
+        :param params: values_data_<row index>_<column index> parameter values, missing values are None
+        :return: sqlalchemy update query
+        """
+        update_col_types = tuple(self.table.c[col_name].type for col_name in update_col_names)
+        values_data = []
+
+        for row_index in range(rows_count):
+            row_data = []
+
+            for col_index, col_type in enumerate(update_col_types):
+                param_name = f"values_data_{row_index}_{col_index}"
+                value = params.get(param_name)
+                cell = value if isinstance(value, ClauseElement) else bindparam(param_name, value, type_=col_type)
+
+                # only the first row is casted, postgres infers types of other rows from it
+                row_data.append(cast(cell, col_type) if row_index == 0 else cell)
+
+            values_data.append(tuple(row_data))
+
+        with_values = select(
+            values(
+                *(Column(col_name, col_type) for col_name, col_type in zip(update_col_names, update_col_types)),
+                name="values_data",
+            ).data(values_data)
+        ).cte("values_data_table")
+
+        non_key_col_names = tuple(col_name for col_name in update_col_names if col_name not in key_fields)
+
+        if set_functions:
+            update_values = {
+                col_name: set_function.get_expression(self.table.c[col_name], with_values.c[col_name])
+                if (set_function := set_functions.get(col_name)) is not None
+                else with_values.c[col_name]
+                for col_name in non_key_col_names
+            }
+        else:
+            update_values = {col_name: with_values.c[col_name] for col_name in non_key_col_names}
+
+        query = (
+            sa_update(self.table)
+            .where(*(self.table.c[col_name] == with_values.c[col_name] for col_name in key_fields))
+            .values(**update_values)
+        )
+
+        if returning_cols:
+            query = query.returning(*returning_cols)
+
+        return query
+
     async def bulk_update(
         self,
         update_data: Sequence[Dict],
@@ -205,59 +474,52 @@ class DatabaseManager:
         key_fields: str | Iterable[str] = "id",
         returning_columns: Optional[Literal["*"] | Iterable[Union["str", "Column"]]] = None,
         set_functions: Optional[Dict[str, str]] = None,
+        transaction: Optional["PatchedTransaction"] = None,
     ) -> List:
         if not update_data:
             return []
 
         key_fields = {key_fields} if isinstance(key_fields, str) else set(key_fields)
-        update_col_names = set(update_data[0].keys())
+        update_col_names = tuple(update_data[0].keys())
+        convert_value_to_raw = self.convert_value_to_raw
         returning_cols = self.parse_returning_argument(returning_columns)
-        set_functions = set_functions or {}
+        resolved_set_functions = self.resolve_set_functions(set_functions)
+        # statement shape depends only on these arguments and batch length
+        cache_key = (
+            self.table,
+            update_col_names,
+            frozenset(key_fields),
+            tuple(sorted((set_functions or {}).items())),
+            returning_cols,
+        )
 
         updated_objects = []
 
-        async with await self.pool.transaction():
+        async with await self.get_bulk_transaction(transaction):
             # can't gather inside transaction
-            for i in range(0, len(update_data), batch_size):
-                batched_data: Sequence[Dict] = update_data[i : i + batch_size]
+            for batched_data in paginate(update_data, batch_size):
+                params = {
+                    f"values_data_{row_index}_{col_index}": convert_value_to_raw(row_update[col_name])
+                    for row_index, row_update in enumerate(batched_data)
+                    for col_index, col_name in enumerate(update_col_names)
+                }
+                build_query = partial(
+                    self.get_bulk_update_query,
+                    update_col_names,
+                    key_fields,
+                    resolved_set_functions,
+                    returning_cols,
+                    len(batched_data),
+                )
+                # sql expressions are rendered into statement, such statement can't be reused
+                has_expressions = any(isinstance(value, ClauseElement) for value in params.values())
 
-                values_data = [
-                    tuple(
-                        cast(self.convert_value_to_raw(row_update[col_name]), self.table.c[col_name].type)
-                        for col_name in update_col_names
-                    )
-                    if index == 0
-                    else tuple(self.convert_value_to_raw(row_update[col_name]) for col_name in update_col_names)
-                    for index, row_update in enumerate(batched_data)
-                ]
-                with_values = select(
-                    values(
-                        *(Column(col_name, self.table.c[col_name].type) for col_name in update_col_names),
-                        name="values_data",
-                    ).data(values_data)
-                ).cte("values_data_table")
-
-                query = (
-                    sa_update(self.table)
-                    .where(*(self.table.c[col_name] == with_values.c[col_name] for col_name in key_fields))
-                    .values(
-                        **{
-                            col_name: BaseSetFunction.get_instance_by_name(set_func_name).get_expression(
-                                self.table.c[col_name], with_values.c[col_name]
-                            )
-                            if (set_func_name := set_functions.get(col_name))
-                            else with_values.c[col_name]
-                            for col_name in update_col_names
-                            if col_name not in key_fields
-                        }
+                updated_objects.extend(
+                    await self.pool.fetch_all_cached(
+                        None if has_expressions else (*cache_key, len(batched_data)), build_query, params
                     )
                 )
 
-                if returning_cols:
-                    query = query.returning(*returning_cols)
-
-                updated_objects.extend(await self.pool.fetch_all(query))
-
         return updated_objects
 
     async def bulk_update_or_create(
@@ -267,6 +529,8 @@ class DatabaseManager:
         batch_size: int = 1000,
         unique_constraint_fields: Optional[str | Tuple[str, ...]] = None,
         returning_columns: Optional[Union[Literal["*"] | Iterable[Union["str", "Column"]]]] = None,
+        set_functions: Optional[Dict[str, str]] = None,
+        transaction: Optional["PatchedTransaction"] = None,
     ) -> Any:
         raise NotImplementedError()
 
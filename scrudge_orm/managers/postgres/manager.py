@@ -1,10 +1,10 @@
-from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Union
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Type, Union
 
-from sqlalchemy import Column, func, select, text
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Column, any_, func, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
 from scrudge_orm.managers.base import DatabaseManager
-from scrudge_orm.managers.set_functions import BaseSetFunction
 from scrudge_orm.query.queryset import RawQuerySet
 from scrudge_orm.utils.sqalchemy import find_foreign_key_relation, get_table_unique_constraints_fields
 
@@ -13,11 +13,24 @@ if TYPE_CHECKING:
     from sqlalchemy.dialects.postgresql import Insert
     from sqlalchemy.sql import ColumnElement
 
+    from scrudge_orm.backends.base import DatabaseBackend
+    from scrudge_orm.backends.patched_transaction import PatchedTransaction
     from scrudge_orm.fields.fields import ManyToManyRelationField
-    from scrudge_orm.models.base import DatabaseModelTypeVar
+    from scrudge_orm.models.base import DatabaseModel, DatabaseModelTypeVar
 
 
 class PostgresManager(DatabaseManager):
+    def __init__(self, table: "Table", model: Type["DatabaseModel"], pool: "DatabaseBackend") -> None:
+        super().__init__(table, model, pool)
+
+        # names of columns to update on conflict depend only on unique constraint
+        self._get_on_conflict_col_names = lru_cache(maxsize=32)(self.get_on_conflict_col_names)
+
+    def get_on_conflict_col_names(self, unique_constraint_fields: Tuple[str, ...]) -> Tuple[str, ...]:
+        return tuple(
+            col.name for col in self.table.c if col.name not in unique_constraint_fields and not col.primary_key
+        )
+
     def get_table_unique_constraint(self) -> Tuple[Tuple[str, ...], Optional[str]]:
         unique_index_where = None
 
@@ -80,10 +93,10 @@ class PostgresManager(DatabaseManager):
         unique_constraint_fields: Optional[str | Tuple[str, ...]] = None,
         returning_columns: Optional[Union[Literal["*"] | Iterable[Union["str", "Column"]]]] = None,
         set_functions: Optional[Dict[str, str]] = None,
+        transaction: Optional["PatchedTransaction"] = None,
     ) -> Any:
         returning_cols = self.parse_returning_argument(returning_columns)
         unique_index_where = None
-        set_functions = set_functions or {}
 
         if unique_constraint_fields is None:
             unique_constraint_fields, unique_index_where = self.get_table_unique_constraint()
@@ -95,36 +108,51 @@ class PostgresManager(DatabaseManager):
         )
 
         updated_or_created_objects = []
+        # statement shape is the same for all batches, only values are changed
+        query = insert(self.table)
+
+        if update:
+            query = query.on_conflict_do_update(
+                index_elements=unique_constraint_fields,
+                index_where=index_where,
+                set_=self.get_on_conflict_update_data(query, set_functions, unique_constraint_fields),
+            )
+        else:
+            query = query.on_conflict_do_nothing(
+                index_elements=unique_constraint_fields,
+                index_where=index_where,
+            )
+
+        if returning_cols:
+            query = query.returning(*returning_cols)
 
-        async with await self.pool.transaction():
+        # compiled statement can be reused by other calls with the same arguments
+        cache_key = (
+            (
+                self.table,
+                update,
+                unique_constraint_fields,
+                unique_index_where,
+                tuple(sorted(set_functions.items())) if set_functions else None,
+                returning_cols,
+            )
+            if unique_index_where is None or isinstance(unique_index_where, str)
+            else None
+        )
+
+        async with await self.get_bulk_transaction(transaction):
             # can't gather inside transaction
             for i in range(0, len(data), batch_size):
                 batch_objects = data[i : i + batch_size]
-                query = insert(self.table)
 
                 if update:
                     update_or_create_data = [self.to_database_data(obj) for obj in batch_objects]
-
-                    on_conflict_data = self.get_on_conflict_update_data(query, set_functions, unique_constraint_fields)
-                    query = query.on_conflict_do_update(
-                        index_elements=unique_constraint_fields,
-                        index_where=index_where,
-                        set_=on_conflict_data,
-                    )
                 else:
-                    update_or_create_data = [self.get_prepared_to_insert_data(obj) for obj in batch_objects]
-
-                    query = query.on_conflict_do_nothing(
-                        index_elements=unique_constraint_fields,
-                        index_where=index_where,
-                    )
+                    update_or_create_data = self.get_prepared_to_insert_batch(batch_objects)
 
-                query = query.values(update_or_create_data)
-
-                if returning_cols:
-                    query = query.returning(*returning_cols)
-
-                updated_or_created_objects.extend(await self.pool.fetch_all(query))
+                updated_or_created_objects.extend(
+                    await self.pool.fetch_all_insert_values(query, update_or_create_data, cache_key)
+                )
 
         return updated_or_created_objects
 
@@ -145,22 +173,22 @@ class PostgresManager(DatabaseManager):
     def get_on_conflict_update_data(
         self, query: "Insert", set_functions: Optional[Dict[str, str]], unique_constraint_fields: str | Tuple[str, ...]
     ) -> Dict:
-        set_functions = set_functions or {}
+        resolved_set_functions = self.resolve_set_functions(set_functions)
         unique_constraint_fields = (
-            (unique_constraint_fields,) if isinstance(unique_constraint_fields, str) else unique_constraint_fields
+            (unique_constraint_fields,)
+            if isinstance(unique_constraint_fields, str)
+            else tuple(unique_constraint_fields)
         )
+        excluded: Any = query.excluded
+        columns = self.table.c
 
         on_conflict_data = {
-            col.name: BaseSetFunction.get_instance_by_name(set_func_name).get_expression(
-                col,
-                query.excluded[col.name],  # type: ignore
-            )
-            if (set_func_name := set_functions.get(col.name))
-            else query.excluded[col.name]  # type: ignore
-            for col in self.table.c
-            if col.name not in unique_constraint_fields and not col.primary_key
+            col_name: set_function.get_expression(columns[col_name], excluded[col_name])
+            if (set_function := resolved_set_functions.get(col_name)) is not None
+            else excluded[col_name]
+            for col_name in self._get_on_conflict_col_names(unique_constraint_fields)
         }
-        on_conflict_data.update(self.get_table_onupdate_defaults)
+        on_conflict_data.update(self._onupdate_defaults)
 
         return on_conflict_data
 
@@ -242,7 +270,11 @@ class PostgresManager(DatabaseManager):
                     func.array_agg(through_model_col_to_current).label(aggregated_column_name),
                 ]
             )
-            .where(through_model_col_to_current.in_(list(current_to_through_model_keys)))
+            # single array parameter instead of parameter per key, sql text and planning don't grow with keys amount
+            .where(
+                through_model_col_to_current
+                == any_(literal(tuple(current_to_through_model_keys), type_=ARRAY(through_model_col_to_current.type)))
+            )
             .group_by(through_model_col_to_destination)
             .cte("m2m_tmp")
         )
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import func, select, text
+from sqlalchemy import func, select
 
 from scrudge_orm.managers.set_functions import BaseSetFunction
 
@@ -13,16 +13,15 @@ class PGArrayUnionSetFunction(BaseSetFunction):
     name = "pg_array_union"
 
     def get_expression(self, column: "Column", column_with_value_to_set: "Column") -> "ColumnElement":
-        source_column_expression = (
-            func.coalesce(text(str(column)), func.cast("{}", column.type)) if column.nullable else text(str(column))
-        )
-        expression = (
-            select(func.unnest(func.array_cat(source_column_expression, text(str(column_with_value_to_set)))))  # type: ignore
-            .distinct()
-            .scalar_subquery()
+        source_column_expression = func.coalesce(column, func.cast("{}", column.type)) if column.nullable else column
+        # unnest is used as from clause of subquery, otherwise tables of columns are added to it
+        # and excluded table of on conflict statement becomes a cross join
+        unnested_value = func.unnest(func.array_cat(source_column_expression, column_with_value_to_set)).column_valued(
+            "value"
         )
+        expression = select(unnested_value).distinct()
 
         if self.set_func_args:
             expression = expression.limit(self.set_func_args)
 
-        return func.array(expression)
+        return func.array(expression.scalar_subquery())  # type: ignore
@@ -1,18 +1,34 @@
 from functools import lru_cache
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, Type
 
 from sqlalchemy import func
 
-from scrudge_orm.utils.imports import get_all_subclasses
-
 if TYPE_CHECKING:
     from sqlalchemy import Column
     from sqlalchemy.sql.elements import ColumnElement
 
 
+def get_not_null_number_expression(column: "Column") -> "ColumnElement":
+    """
+    Get expression of column, that replaces NULL with 0
+    :param column: sqlalchemy column
+    :return: sqlalchemy expression
+    """
+    return func.coalesce(column, 0) if column.nullable else column
+
+
 class BaseSetFunction:
     name: str
 
+    # set function classes by name, filled on subclass creation
+    registry: ClassVar[Dict[str, Type["BaseSetFunction"]]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+
+        if "name" in cls.__dict__:
+            BaseSetFunction.registry[cls.name] = cls
+
     def __init__(self, set_func_args: str) -> None:
         self.set_func_args = set_func_args
 
@@ -21,13 +37,12 @@ class BaseSetFunction:
     def get_instance_by_name(cls, name: str) -> "BaseSetFunction":
         from .postgres import set_functions  # noqa
 
-        for klass in get_all_subclasses(cls):
-            set_func_name, _, set_func_args = name.partition("__")
+        set_func_name, _, set_func_args = name.partition("__")
 
-            if klass.name == set_func_name:
-                return klass(set_func_args)
+        if (klass := cls.registry.get(set_func_name)) is None:
+            raise NotImplementedError(f"SetFunction klass not implemented for '{name}'")
 
-        raise NotImplementedError(f"SetFunction klass not implemented for '{name}'")
+        return klass(set_func_args)
 
     def get_expression(self, column: "Column", column_with_value_to_set: "Column") -> "ColumnElement":
         """
@@ -43,18 +58,14 @@ class IncrementSetFunction(BaseSetFunction):
     name = "+"
 
     def get_expression(self, column: "Column", column_with_value_to_set: "Column") -> "ColumnElement":
-        source_column_expression = func.coalesce(column, 0) if column.nullable else column
-
-        return source_column_expression + column_with_value_to_set
+        return get_not_null_number_expression(column) + column_with_value_to_set
 
 
 class DecrementSetFunction(BaseSetFunction):
     name = "-"
 
     def get_expression(self, column: "Column", column_with_value_to_set: "Column") -> "ColumnElement":
-        source_column_expression = func.coalesce(column, 0) if column.nullable else column
-
-        return source_column_expression - column_with_value_to_set
+        return get_not_null_number_expression(column) - column_with_value_to_set
 
 
 class GreatestSetFunction(BaseSetFunction):
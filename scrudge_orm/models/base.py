@@ -1,7 +1,8 @@
 import logging
+import sys
 from collections import defaultdict
-from copy import deepcopy
-from functools import lru_cache, partial
+from copy import copy
+from functools import partial
 from itertools import chain
 from typing import (
     TYPE_CHECKING,
@@ -12,6 +13,7 @@ from typing import (
     Dict,
     Final,
     ForwardRef,
+    FrozenSet,
     Iterable,
     List,
     Literal,
@@ -44,7 +46,7 @@ logger = logging.getLogger(__name__)
 
 model_register: Dict[str, Type["DatabaseModel"]] = {}
 
-_record_not_ready: Final = type("ObjectsNotFetchedFromDatabase", (object,), {})()
+_record_not_ready: Final = type("ObjectsNotFetchedFromDatabase", (object,), {"__slots__": ()})()
 
 _models_with_forward_refs: Set[str] = set()
 _not_ready_sql_models: Set[str] = set()
@@ -68,11 +70,17 @@ def _create_model_callback_function(
     model.model_fields[field_related_name] = Field(default=_record_not_ready)
     model.model_fields[field_related_name].annotation = model.__annotations__[field_related_name]
 
-    try:
-        model.model_rebuild()
-    except PydanticUndefinedAnnotation:
+    # other forward referenced models are not created yet
+    if any(
+        isinstance(field.to_model, str) and field.to_model not in model_register
+        for field in model.related_fields.values()
+    ):
         return None
 
+    # schema of deferred model is built on the first validation, only already built schema is rebuilt
+    if model.__pydantic_complete__:
+        model.model_rebuild(force=True, raise_errors=False)
+
     if model.register_name in _not_ready_sql_models:
         DatabaseModelMeta.modify_foreign_keys_for_model(model)
         DatabaseModelMeta.setup_database_structure_and_manager(model)
@@ -113,6 +121,8 @@ class MetaBase(metaclass=MetaBaseType):
     visible_name: Optional[str] = None
 
     serializer_omit_fields: Optional[Iterable[str]] = None
+    # create instances from database rows without validation, values are not decrypted
+    trust_db: bool = False
 
     __is_inheritance_class: bool = True  # skip validation for inheritance classes
 
@@ -128,12 +138,13 @@ class MetaBase(metaclass=MetaBaseType):
             len(table_name) <= 63
         ), f"Generated table name '{table_name}' for class '{class_name}' more than allowed 63 symbols"
 
+        columns = {}
+
         for attr_name, v in model.scrudge_db_fields.items():
             v.sqlalchemy_column.name = attr_name
+            columns[attr_name] = v.sqlalchemy_column
 
-        sql_alchemy_table = Table(
-            table_name, cls.db_backend.metadata, *[v.sqlalchemy_column for v in model.scrudge_db_fields.values()]
-        )
+        sql_alchemy_table = Table(table_name, cls.db_backend.metadata, *columns.values())
 
         for index in chain(cls.indexes, cls.unique_indexes):
             index_name = f"{table_name}_{index.name}_idx"
@@ -143,7 +154,7 @@ class MetaBase(metaclass=MetaBaseType):
 
             SQLAlchemyIndex(
                 index_name,
-                *[getattr(sql_alchemy_table.c, col_name) for col_name in index.fields],
+                *[columns[col_name] for col_name in index.fields],
                 **index.get_create_index_kwargs(),
             )
 
@@ -212,24 +223,34 @@ class DatabaseModelMeta(ModelMetaclass):
 
         # DatabaseModel is base class for all models. Skip
         if not is_root_database_model:
+            # fields of base class already include fields of its bases
+            inherited_fields: Dict[str, DatabaseWithValidationField] = {}
+
             for base_cls in reversed(bases):
                 if issubclass(base_cls, DatabaseModel):
-                    # need to deepcopy sqlalchemy column, we can't same instance of column between tables
-                    database_fields.update(
-                        {
-                            k: DatabaseWithValidationField(
-                                pydantic_field=v.pydantic_field, sqlalchemy_column=deepcopy(v.sqlalchemy_column)
-                            )
-                            for k, v in base_cls.scrudge_db_fields.items()
-                        }
-                    )
+                    inherited_fields.update(base_cls.scrudge_db_fields)
                     related_fields.update(base_cls.related_fields)
 
+            # need to copy fields, we can't same instance of sqlalchemy column between tables.
+            # fields are merged before copy, so field of several bases is copied once.
+            # proxy model has no table, its fields are copied by non proxy subclasses only
+            database_fields.update(
+                inherited_fields if meta_cls.is_proxy else {k: copy(v) for k, v in inherited_fields.items()}
+            )
+
         klass: Type["DatabaseModel"] = super().__new__(mcs, name, bases, attrs)
 
         type.__setattr__(klass, "scrudge_db_fields", database_fields)
         type.__setattr__(klass, "related_fields", related_fields)
+        # related fields are not table columns, names are used to exclude them from dumped data
+        type.__setattr__(klass, "related_field_names", frozenset(related_fields))
         type.__setattr__(klass, "register_name", get_register_model_name(klass.__module__, klass.__name__))
+        # names are fixed after class creation, they are used by every query
+        type.__setattr__(klass, "_visible_name", meta_cls.visible_name or name)
+        type.__setattr__(
+            klass, "_table_name", meta_cls.table_name or get_table_name_for_class(klass.__name__, klass.__module__)
+        )
+        type.__setattr__(klass, "_pk_column_name", mcs.find_pk_column_name(klass))
 
         model_register[klass.register_name] = klass
 
@@ -260,7 +281,7 @@ class DatabaseModelMeta(ModelMetaclass):
                     _not_ready_sql_models.add(klass.register_name)
 
             if forward_model_name is not None:
-                _create_model_callbacks[forward_model_name].append(
+                _create_model_callbacks[sys.intern(forward_model_name)].append(
                     partial(_create_model_callback_function, model=klass, related_field=related_field)
                 )
                 _models_with_forward_refs.add(klass.register_name)
@@ -277,6 +298,19 @@ class DatabaseModelMeta(ModelMetaclass):
 
         return klass
 
+    @staticmethod
+    def find_pk_column_name(model: Type["DatabaseModel"]) -> Optional[str]:
+        pk_columns = [
+            col_name
+            for col_name, field_value in model.scrudge_db_fields.items()
+            if field_value.sqlalchemy_column.primary_key
+        ]
+
+        if len(pk_columns) > 1:
+            logger.warning(f"Found several postgresql pk for " f"table {model.__name__}, using one of them...")
+
+        return pk_columns[0] if pk_columns else None
+
     @staticmethod
     def modify_foreign_keys_for_model(model: Type["DatabaseModel"]) -> None:
         for related_field in model.related_fields.values():
@@ -338,21 +372,22 @@ DatabaseModelTypeVar = TypeVar("DatabaseModelTypeVar", bound="DatabaseModel")
 
 
 class DatabaseModel(BaseModel, metaclass=DatabaseModelMeta):
-    model_config = ConfigDict(arbitrary_types_allowed=True, validate_assignment=True)
+    # pydantic schema is built on the first validation instead of model class creation
+    model_config = ConfigDict(arbitrary_types_allowed=True, validate_assignment=True, defer_build=True)
 
     def __getattribute__(self, item: str) -> Any:
+        # class attribute is read with type(), it doesn't go through this method again
         if (
-            item in object.__getattribute__(self, "related_fields")
-            and object.__getattribute__(self, "__dict__").get(item) == _record_not_ready
+            item in type(self).related_field_names
+            and object.__getattribute__(self, "__dict__").get(item) is _record_not_ready
         ):
             raise AttributeError(f"Attribute '{item}' hasn't fetched yet. Use await {item}__qs to fetch.")
-        else:
-            return super().__getattribute__(item)
+
+        return object.__getattribute__(self, item)
 
     def __getattr__(self, item: str) -> Any:
-        if len((splitted_item := item.split("__qs"))) == 2:
-            related_name, _ = splitted_item
-            related_field = self.related_fields.get(related_name)
+        if item.endswith("__qs"):
+            related_field = type(self).related_fields.get(item[: -len("__qs")])
 
             if related_field is None or related_field.related_name is None or related_field.to_manager is None:
                 raise AttributeError(f"{self.__class__.__name__} object has no attribute {item}")
@@ -365,7 +400,7 @@ class DatabaseModel(BaseModel, metaclass=DatabaseModelMeta):
             object.__setattr__(self, f"{related_field.related_name}__qs", queryset)
 
             return queryset
-        elif item in self.related_fields:
+        elif item in type(self).related_field_names:
             raise AttributeError(f"Attribute '{item}' hasn't fetched yet. Use await {item}__qs to fetch.")
         else:
             return super().__getattr__(item)  # type: ignore
@@ -375,54 +410,44 @@ class DatabaseModel(BaseModel, metaclass=DatabaseModelMeta):
         objects: ClassVar[DatabaseManager]
         scrudge_db_fields: ClassVar[Dict[str, DatabaseWithValidationField]]
         related_fields: ClassVar[Dict[str, DatabaseWithValidationField | RelatedFieldBase]]
+        related_field_names: ClassVar[FrozenSet[str]]
 
         class serializer_class(BaseModelSerializer):
             pass
 
         connection: ClassVar[DatabaseBackend]
         register_name: ClassVar[str]
+        _visible_name: ClassVar[str]
+        _table_name: ClassVar[str]
+        _pk_column_name: ClassVar[Optional[str]]
 
     class Meta(MetaBase):
         is_proxy = True
 
     @classmethod
-    @lru_cache
     def get_visible_name(cls) -> str:
-        return cls.Meta.visible_name or cls.__name__
+        return cls._visible_name
 
     @classmethod
-    @lru_cache
     def get_table_name(cls) -> str:
-        table_name = cls.Meta.table_name
-
-        if table_name is None:
-            table_name = get_table_name_for_class(cls.__name__, cls.__module__)
-
-        return table_name
+        return cls._table_name
 
     @classmethod
-    @lru_cache
     def get_pk_column_name(cls) -> str:
-        pk_columns = [
-            col_name
-            for col_name, field_value in cls.scrudge_db_fields.items()
-            if field_value.sqlalchemy_column.primary_key
-        ]
-
-        if not pk_columns:
+        if cls._pk_column_name is None:
             raise AttributeError(f"Can't find any postgresql pk for {cls.__name__}")
-        if len(pk_columns) > 1:
-            logger.warning(f"Found several postgresql pk for " f"table {cls.__name__}, using one of them...")
 
-        return pk_columns[0]
+        return cls._pk_column_name
 
     @classmethod
     def serialize_bulk(cls, data: Iterable[Self | Dict]) -> Any:
-        return tuple(item.model_dump() if isinstance(item, cls) else item for item in data)
+        return [item.model_dump() if isinstance(item, cls) else item for item in data]
 
     @classmethod
     def to_models_bulk(cls, data: Iterable[Dict]) -> Tuple[Self, ...]:
-        return tuple(cls(**item) for item in data)
+        model_validate = cls.model_validate
+
+        return tuple([model_validate(item) for item in data])
 
     async def save(self) -> Self:
         pk_field = self.get_pk_column_name()
@@ -451,8 +476,8 @@ class DatabaseModel(BaseModel, metaclass=DatabaseModelMeta):
             .fetch_single()
         )
 
-        for attr_name in field_values:
-            setattr(self, attr_name, updated_reply_data[attr_name])
+        # database values are set as is if model trusts database, like for instances created by trusted fetch
+        self.objects.refresh_from_row(self, {attr_name: updated_reply_data[attr_name] for attr_name in field_values})
 
         return self
 
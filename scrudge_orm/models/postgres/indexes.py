@@ -16,7 +16,8 @@ class PostgresIndex(Index):
 
     def get_create_index_kwargs(self) -> Dict:
         kwargs = super().get_create_index_kwargs()
-        kwargs.update(self.model_dump(exclude={"name", "fields"}, exclude_none=True))
+        # all options are plain values, so they are read from __dict__ without pydantic serializer
+        kwargs.update({k: v for k, v in self.__dict__.items() if k not in ("name", "fields") and v is not None})
 
         return kwargs
 
@@ -5,6 +5,8 @@ class Aggregation:
     default_label: str
     sql_func: str
 
+    __slots__ = ("field", "label")
+
     def __init__(self, field: str, label: Optional[str] = None):
         self.field = field
         self.label = label or self.default_label
@@ -14,17 +16,25 @@ class Sum(Aggregation):
     default_label = "sum"
     sql_func = "sum"
 
+    __slots__ = ()
+
 
 class Count(Aggregation):
     default_label = "count"
     sql_func = "count"
 
+    __slots__ = ()
+
 
 class Max(Aggregation):
     default_label = "max"
     sql_func = "max"
 
+    __slots__ = ()
+
 
 class ArrayAGG(Aggregation):
     default_label = "array_aggregation"
     sql_func = "array_agg"
+
+    __slots__ = ()
@@ -6,17 +6,19 @@ if TYPE_CHECKING:
 
 
 class BaseCondition:
+    __slots__ = ("conditions", "fields_values")
+
     def __init__(self, *conditions: "BaseCondition", **fields_values: Any):
         self.conditions = conditions
         self.fields_values = fields_values
 
 
 class AndCondition(BaseCondition):
-    pass
+    __slots__ = ()
 
 
 class OrCondition(BaseCondition):
-    pass
+    __slots__ = ()
 
 
 class F:
@@ -26,9 +28,11 @@ class F:
     It will filter records with updated >= created
     """
 
-    def __init__(self, column_name: str) -> None:
+    __slots__ = ("column_name", "value_to_sum")
+
+    def __init__(self, column_name: str, value_to_sum: Any = None) -> None:
         self.column_name = column_name
-        self.value_to_sum = None
+        self.value_to_sum = value_to_sum
 
     def get_expression(self, table: "Table") -> Any:
         column = table.c[self.column_name]
@@ -36,20 +40,11 @@ class F:
         return column if self.value_to_sum is None else column + self.value_to_sum
 
     def __add__(self, other: Any) -> Self:
-        if self.value_to_sum is None:
-            self.value_to_sum = other
-        else:
-            self.value_to_sum += other
-
-        return self
+        # expression isn't changed, it can be reused in other queries
+        return type(self)(self.column_name, other if self.value_to_sum is None else self.value_to_sum + other)
 
     def __sub__(self, other: Any) -> Self:
-        if self.value_to_sum is None:
-            self.value_to_sum = -other
-        else:
-            self.value_to_sum -= other
-
-        return self
+        return type(self)(self.column_name, -other if self.value_to_sum is None else self.value_to_sum - other)
 
 
 class SupportedOperator(str, Enum):
@@ -75,7 +70,8 @@ class SupportedOperator(str, Enum):
 
     @classmethod
     def get_operator(cls, value: str) -> Self:
-        try:
-            return cls(value)
-        except ValueError as exc:
-            raise ValueError(f"Unsupported operator - '{value}'") from exc
+        # direct lookup in members by value map, without enum call machinery
+        if (operator := cls._value2member_map_.get(value)) is None:
+            raise ValueError(f"Unsupported operator - '{value}'")
+
+        return operator  # type: ignore
@@ -9,6 +9,8 @@ if TYPE_CHECKING:
 class BaseFunction:
     name: str
 
+    __slots__ = ("column_name", "args")
+
     def __init__(self, column_name: str, *args: Any) -> None:
         self.column_name = column_name
         self.args = args
@@ -21,3 +23,5 @@ class BaseFunction:
 
 class ArrayRemove(BaseFunction):
     name: str = "array_remove"
+
+    __slots__ = ()
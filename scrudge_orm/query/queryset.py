@@ -1,6 +1,7 @@
 import operator
-from asyncio import gather, iscoroutinefunction
+from asyncio import create_task, gather, iscoroutinefunction, sleep
 from collections import defaultdict
+from functools import lru_cache
 from itertools import chain
 from typing import (
     TYPE_CHECKING,
@@ -8,6 +9,7 @@ from typing import (
     Callable,
     DefaultDict,
     Dict,
+    FrozenSet,
     Iterable,
     List,
     Literal,
@@ -19,9 +21,27 @@ from typing import (
     Union,
 )
 
-from sqlalchemy import and_, delete, desc, func, not_, nullslast, or_, select, true, update  # type: ignore
-from sqlalchemy.sql import Delete, Select, Update
+from sqlalchemy import (  # type: ignore
+    ARRAY,
+    all_,
+    and_,
+    any_,
+    bindparam,
+    delete,
+    desc,
+    exists,
+    func,
+    literal_column,
+    not_,
+    nullslast,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.sql import ClauseElement, Delete, Select, Update
 from sqlalchemy.sql.elements import Label
+from sqlalchemy.sql.operators import ColumnOperators
 
 from scrudge_orm.query.aggregations import Aggregation
 from scrudge_orm.query.conditions import AndCondition, BaseCondition, F, OrCondition, SupportedOperator
@@ -34,8 +54,13 @@ if TYPE_CHECKING:
     from scrudge_orm.managers.base import DatabaseManager
     from scrudge_orm.models.base import DatabaseModel
 
+# path of joined model with (column label, column name) pairs of its selected columns, parent goes before child
+JoinedColumnsPlan = Tuple[Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]], ...]
+
 
 class CallBackMixin:
+    __slots__ = ("callbacks",)
+
     def __init__(self) -> None:
         super().__init__()
         self.callbacks: List[Callable] = []
@@ -65,6 +90,22 @@ class CallBackMixin:
 
 
 class QuerySet(CallBackMixin):
+    __slots__ = (
+        "where_conditions",
+        "applied_conditions_count",
+        "annotations",
+        "manager",
+        "return_raw",
+        "flat",
+        "fetch_one",
+        "dict_key_fields",
+        "query",
+        "current_columns_to_select",
+        "prefetch_field_columns",
+        "joined_models",
+        "select_exists",
+    )
+
     operator_comparison = {
         SupportedOperator.eq: operator.eq,
         SupportedOperator.neq: operator.ne,
@@ -90,6 +131,17 @@ class QuerySet(CallBackMixin):
         SupportedOperator.concat: "concat",
     }
 
+    # all supported operators as functions of column and value, resolved once instead of getattr on every call
+    operator_functions: Dict[SupportedOperator, Callable[[Any, Any], Any]] = {
+        **operator_comparison,
+        **{
+            field_operator: getattr(ColumnOperators, method_name)
+            for field_operator, method_name in functions_comparison.items()
+        },
+    }
+
+    condition_functions: Dict[Type[BaseCondition], Callable[..., Any]] = {AndCondition: and_, OrCondition: or_}
+
     def __init__(
         self,
         *conditions: AndCondition | OrCondition,
@@ -99,6 +151,8 @@ class QuerySet(CallBackMixin):
     ):
         super().__init__()
         self.where_conditions: List["BooleanClauseList"] = []
+        # amount of where conditions already applied to query, compile applies every condition once
+        self.applied_conditions_count = 0
         self.annotations: Dict[str, "ColumnElement"] = {}
         self.manager = manager
         self.return_raw = False
@@ -107,9 +161,9 @@ class QuerySet(CallBackMixin):
         self.dict_key_fields: Optional[str | Tuple[str, ...]] = None
         self.query: Select | Update | Delete = select([self.manager.table])
         self.current_columns_to_select: List[Union["Table", "ColumnElement"]] = [*self.manager.table.columns]
-        self.callbacks: List[Callable] = []
         self.prefetch_field_columns: DefaultDict[str, Tuple["ColumnElement", ...]] = defaultdict(tuple)
         self.joined_models: Set[str] = set()
+        self.select_exists = False
 
         self._update_query_condition(self.prepare_queryset_parameters(*conditions, **field_values), negative=negative)
 
@@ -120,7 +174,9 @@ class QuerySet(CallBackMixin):
             self.where_conditions.append(self.parse_expression(filter_condition))
 
     @staticmethod
+    @lru_cache(maxsize=2048)
     def parse_field_name_and_operator(field_name_expression: str) -> Tuple[str, SupportedOperator]:
+        # filter keys are a small closed set in application code, so they are parsed once
         splitted_field_expr = field_name_expression.split("__")
         field_name = splitted_field_expr[0]
         field_operator = (
@@ -131,11 +187,7 @@ class QuerySet(CallBackMixin):
         return field_name, field_operator
 
     def parse_expression(self, condition: BaseCondition) -> "BooleanClauseList":
-        if isinstance(condition, AndCondition):
-            sqlalchemy_func = and_
-        elif isinstance(condition, OrCondition):
-            sqlalchemy_func = or_
-        else:
+        if (sqlalchemy_func := self.condition_functions.get(type(condition))) is None:
             raise ValueError("Unsupported condition")
 
         args = []
@@ -158,39 +210,69 @@ class QuerySet(CallBackMixin):
         return sqlalchemy_func(*args)
 
     def _get_column_by_name(self, column_name: str) -> "ColumnElement":
-        try:
-            column = next(
-                (
-                    item
-                    for item in (self.annotations.get(column_name), getattr(self.manager.table.c, column_name, None))
-                    if item is not None
-                ),
-            )
-        except StopIteration:
-            column = None
+        # annotations override table columns, both are looked up by key without building temporary objects
+        column = self.annotations.get(column_name)
+
+        if column is None:
+            column = self.manager.table.c.get(column_name)
 
         if column is None:
             raise ValueError(f"Column with name: '{column_name}' not defined")
 
         return column
 
+    def eval_array_comparison(self, field_operator: SupportedOperator, column: "ColumnElement", value: Any) -> Any:
+        """
+        Compare column with array parameter instead of expanded IN list, so statement doesn't depend on amount of values
+        :param field_operator: in or not in operator
+        :param column: column to compare
+        :param value: collection of values
+        :return: sqlalchemy expression or None if value can't be passed as array
+        """
+        if (
+            not self.manager.pool.supports_array_comparison
+            # prefetch passes records by relation key mapping, its keys are compared
+            or not isinstance(value, (list, tuple, set, frozenset, dict))
+            or isinstance(column.type, ARRAY)
+            or any(isinstance(item, ClauseElement) for item in value)
+        ):
+            return None
+
+        array_value = bindparam(None, list(value), type_=ARRAY(column.type))  # type: ignore
+
+        # expression is grouped, so exclude renders NOT (...) instead of negated operator like "!= ANY"
+        if field_operator == SupportedOperator.not_in:
+            return (column != all_(array_value)).self_group()
+
+        return (column == any_(array_value)).self_group()
+
     def eval_operator(self, field_operator: SupportedOperator, field_name: str, value: Any) -> Any:
         # can't use or there due to TypeError
         column = self._get_column_by_name(field_name)
 
-        if field_operator in self.operator_comparison:
-            return self.operator_comparison[field_operator](column, value)
+        if (
+            field_operator in (SupportedOperator.in_, SupportedOperator.not_in)
+            and (expression := self.eval_array_comparison(field_operator, column, value)) is not None
+        ):
+            return expression
 
-        return getattr(column, self.functions_comparison[field_operator])(value)
+        return self.operator_functions[field_operator](column, value)
 
     def compile(self) -> Self:
-        if self.where_conditions:
-            self.query = self.query.where(*self.where_conditions)
+        if len(self.where_conditions) > self.applied_conditions_count:
+            self.query = self.query.where(*self.where_conditions[self.applied_conditions_count :])
+            self.applied_conditions_count = len(self.where_conditions)
+
+        if self.select_exists:
+            # no row is returned if nothing exists, database stops on the first matched row
+            self.query = select(true()).where(exists(self.query.with_only_columns(literal_column("1"))))  # type: ignore
+            self.select_exists = False
 
         return self
 
     async def _process_query_common(self) -> Any:
-        if self.joined_models or self.prefetch_field_columns:
+        # update and delete statements return columns of model table only, joined models are selected by select only
+        if self.prefetch_field_columns or (self.joined_models and isinstance(self.query, Select)):
             # in this case need to fetch raw results, prefetch related tables and then construct the model
             results = await RawQuerySet(
                 self.query,
@@ -207,6 +289,44 @@ class QuerySet(CallBackMixin):
         else:
             return await self.manager.fetch_all(self.query)
 
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def get_joined_columns_plan(
+        root_table: "Table", columns_to_select: Tuple[Any, ...], joined_models: FrozenSet[str]
+    ) -> JoinedColumnsPlan:
+        """
+        Plan of moving joined models columns of result rows into nested dicts.
+        Labeled columns of joined models are reused by managers, so plan is computed once per query shape
+        :param root_table: table of queryset model
+        :param columns_to_select: selected columns
+        :param joined_models: names of joined models, nested models are separated by dot
+        :return: path of every joined model with its parents, parent goes before child,
+        with (column label, column name) pairs of its selected columns
+        """
+        joined_model_columns: DefaultDict[str, List[Tuple[str, str]]] = defaultdict(list)
+
+        for column in columns_to_select:
+            # labeled column wraps column itself, base_columns walks the whole expression
+            base_column = column.element if isinstance(column, Label) else column
+
+            if (column_table := getattr(base_column, "table", None)) is None or column_table == root_table:
+                continue
+
+            assert isinstance(column, Label)
+            joined_model_name, _, column_name = column.name.rpartition(".")
+            joined_model_columns[joined_model_name].append((column.name, column_name))
+
+        columns_by_path = {
+            tuple(joined_model_name.split(".")): tuple(joined_model_columns[joined_model_name])
+            for joined_model_name in joined_models
+            if joined_model_columns[joined_model_name]
+        }
+        joined_model_paths = sorted(
+            {path[:depth] for path in columns_by_path for depth in range(1, len(path) + 1)}, key=len
+        )
+
+        return tuple((path, columns_by_path.get(path, ())) for path in joined_model_paths)
+
     async def _process_add_prefetch_tables_data(self, current_results: Optional[Dict | List[Dict]]) -> None:
         """
         Adds to current results data from prefetched tables
@@ -217,66 +337,39 @@ class QuerySet(CallBackMixin):
             return None
 
         results_as_iter = [current_results] if isinstance(current_results, dict) else current_results
-        records_by_related_fields: DefaultDict[str, DefaultDict[Any, list]] = defaultdict(lambda: defaultdict(list))
+        # prefetch serializers look up records by every fetched key, so inner dicts stay defaultdict
+        records_by_related_fields: Dict[str, DefaultDict[Any, list]] = {
+            prefetch_field_name: defaultdict(list) for prefetch_field_name in self.prefetch_field_columns
+        }
         tasks_to_async_run = []
 
         from scrudge_orm.fields.fields import RelatedFieldBase
 
-        current_to_destination_model_keys: DefaultDict[str, list] = defaultdict(list)  # o2m
-        joined_model_columns: DefaultDict[str, List[Tuple[str, str]]] = defaultdict(list)
-        root_model_col_names: Set[str] = set()
-
-        for column in self.current_columns_to_select:
-            if isinstance(column, Label):
-                base_column = list(column.base_columns)[0]  # type: ignore
-            else:
-                base_column = column
-
-            if (column_table := getattr(base_column, "table", None)) is None:
-                continue
-
-            if column_table == self.manager.table:
-                root_model_col_names.add(column.name)  # type: ignore
-            else:
-                assert isinstance(column, Label)
-                name_splitted = column.name.split(".")
-                joined_model_name = ".".join(name_splitted[:-1])
-                column_name = name_splitted[-1]
+        current_to_destination_model_keys: Dict[str, list] = {
+            prefetch_field_name: [] for prefetch_field_name in self.prefetch_field_columns
+        }  # o2m
+        for prefetch_field_name in self.prefetch_field_columns:
+            related_field: RelatedFieldBase = self.manager.model.related_fields[prefetch_field_name]  # type: ignore
+            assert isinstance(
+                related_field, RelatedFieldBase
+            ), f"'{related_field.related_name}' not supported to prefetch"
 
-                joined_model_columns[joined_model_name].append((column_name, column.name))
-
-        for item in results_as_iter:
-            for prefetch_field_name in self.prefetch_field_columns:
-                related_field: RelatedFieldBase = self.manager.model.related_fields[prefetch_field_name]  # type: ignore
-                assert isinstance(
-                    related_field, RelatedFieldBase
-                ), f"'{related_field.related_name}' not supported to prefetch"
-
-                _, current_model_column = related_field.get_current_model_to_relation_columns()
+            _, current_model_column = related_field.get_current_model_to_relation_columns()
+            destination_model_keys = current_to_destination_model_keys[prefetch_field_name]
+            records_by_key = records_by_related_fields[prefetch_field_name]
 
+            for item in results_as_iter:
                 item[prefetch_field_name] = related_field.get_default_value()
 
-                if item[current_model_column.name] is not None:
-                    current_to_destination_model_keys[prefetch_field_name].append(item[current_model_column.name])
-                    records_by_related_fields[prefetch_field_name][item[current_model_column.name]].append(item)
-
-            # infinite nested default dict
-            related_tables_attributes: DefaultDict[str, DefaultDict] = defaultdict(
-                lambda: defaultdict(related_tables_attributes.default_factory)  # noqa: B023
-            )
-
-            for joined_model_name in self.joined_models:
-                for column_name, column_label in joined_model_columns[joined_model_name]:
-                    nested_obj_to_set = related_tables_attributes
-
-                    for nested_model_name in joined_model_name.split("."):
-                        nested_obj_to_set = nested_obj_to_set[nested_model_name]
-
-                    nested_obj_to_set[column_name] = item.pop(column_label)
-
-            item.update(related_tables_attributes)
+                if (key := item[current_model_column.name]) is not None:
+                    destination_model_keys.append(key)
+                    records_by_key[key].append(item)
 
         for prefetch_field_name, columns_to_select in self.prefetch_field_columns.items():
+            # records without relation keep default value, there is nothing to fetch
+            if not records_by_related_fields[prefetch_field_name]:
+                continue
+
             related_field = self.manager.model.related_fields[prefetch_field_name]  # type: ignore
 
             tasks_to_async_run.append(
@@ -290,12 +383,55 @@ class QuerySet(CallBackMixin):
             )
 
         # can't gather queries inside transaction. runtime will be broken
-        if tasks_to_async_run:
-            if self.manager.pool.is_on_transaction():
+        is_on_transaction = self.manager.pool.is_on_transaction()
+        prefetch_tasks = []
+
+        if tasks_to_async_run and not is_on_transaction:
+            # start prefetch queries before reshaping of joined models, so database works while records are reshaped
+            prefetch_tasks = [create_task(coro) for coro in tasks_to_async_run]
+
+        try:
+            if prefetch_tasks:
+                await sleep(0)
+
+            joined_columns_plan = (
+                self.get_joined_columns_plan(
+                    self.manager.table, tuple(self.current_columns_to_select), frozenset(self.joined_models)
+                )
+                if self.joined_models and isinstance(self.query, Select)
+                else ()
+            )
+
+            if joined_columns_plan:
+                for item in results_as_iter:
+                    pop = item.pop
+                    nested_objects: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+                    # dict of every joined model is built in one comprehension, parent dict already exists for nested one
+                    for path, columns in joined_columns_plan:
+                        nested_objects[path] = nested_object = {
+                            column_name: pop(column_label) for column_label, column_name in columns
+                        }
+                        (item if len(path) == 1 else nested_objects[path[:-1]])[path[-1]] = nested_object
+        except BaseException:
+            # started prefetch queries must not outlive failed call, they use connection of the caller
+            for task in prefetch_tasks:
+                task.cancel()
+
+            await gather(*prefetch_tasks, return_exceptions=True)
+
+            # coroutines to run inside transaction were never started
+            if not prefetch_tasks:
                 for coro in tasks_to_async_run:
-                    await coro
-            else:
-                await gather(*tasks_to_async_run)
+                    coro.close()
+
+            raise
+
+        if prefetch_tasks:
+            await gather(*prefetch_tasks)
+        elif is_on_transaction:
+            for coro in tasks_to_async_run:
+                await coro
 
     async def process_query(self) -> Any:
         self.compile()
@@ -355,7 +491,8 @@ class QuerySet(CallBackMixin):
         :return: None
         """
         key_fields_as_tuple = (key_fields,) if isinstance(key_fields, str) else key_fields
-        unique_selected_columns = set(chain(key_fields_as_tuple, field_names))
+        # dict keeps columns order, key columns go first
+        unique_selected_columns = dict.fromkeys(chain(key_fields_as_tuple, field_names))
 
         self.dict_key_fields = key_fields
         self.values_list(*unique_selected_columns, flat=flat)
@@ -405,9 +542,10 @@ class QuerySet(CallBackMixin):
     def exists(self) -> Self:
         assert isinstance(self.query, Select), "Select query only allowed"
 
-        self.query = self.query.with_only_columns(true)  # type: ignore
-        self.current_columns_to_select = [true]  # type: ignore
-        self.fetch_single()
+        # query is wrapped into EXISTS on compile, filters can be added after this call
+        self.select_exists = True
+        self.current_columns_to_select = [true()]
+        self.fetch_one = True
         self.return_raw = True
         self.flat = True
 
@@ -454,14 +592,16 @@ class QuerySet(CallBackMixin):
     def update(self, returning: Optional[str | Iterable[str] | Literal["*"]] = None, **field_values: Any) -> Self:
         assert field_values, "Need to specify values to update"
 
-        self.query = update(self.manager.table)
-        self.query = self.query.values(**{k: self.manager.convert_value_to_raw(v) for k, v in field_values.items()})
+        convert_value_to_raw = self.manager.convert_value_to_raw
+        self.query = update(self.manager.table).values({k: convert_value_to_raw(v) for k, v in field_values.items()})
+        self.applied_conditions_count = 0
         self.__update_qs_returning(returning=returning)
 
         return self
 
     def delete(self, returning: Optional[str | Iterable[str] | Literal["*"]] = None) -> Self:
         self.query = delete(self.manager.table)
+        self.applied_conditions_count = 0
         self.__update_qs_returning(returning=returning)
 
         return self
@@ -550,9 +690,9 @@ class QuerySet(CallBackMixin):
                 label_prefixes.append(related_field_name)
                 prefix = ".".join(label_prefixes)
 
-                for col in related_field.to_manager.table.c:
-                    col_name = f"{prefix}.{col.name}"
-                    labeled_column = col.label(col_name)
+                for col, labeled_column in zip(
+                    related_field.to_manager.table.c, related_field.to_manager.get_labeled_columns(prefix)
+                ):
                     self.current_columns_to_select.append(labeled_column)
                     self.annotations[f"{prefix}__{col.name}"] = labeled_column
 
@@ -586,9 +726,7 @@ class QuerySet(CallBackMixin):
 
         assert isinstance(self.query, Select), "Can't select related tables on non selectable query"
 
-        for col in model.objects.table.c:
-            col_name = f"{join_model_name}.{col.name}"
-            labeled_column = col.label(col_name)
+        for col, labeled_column in zip(model.objects.table.c, model.objects.get_labeled_columns(join_model_name)):
             self.current_columns_to_select.append(labeled_column)
             self.annotations[f"{join_model_name}__{col.name}"] = labeled_column
 
@@ -664,6 +802,8 @@ class QuerySet(CallBackMixin):
 
 
 class RawQuerySet(CallBackMixin):
+    __slots__ = ("query", "pool", "flat", "fetch_one", "dict_key_fields")
+
     def __init__(
         self,
         query: Select | Update | Delete | Any,
@@ -682,20 +822,27 @@ class RawQuerySet(CallBackMixin):
     async def _process_query_raw(self) -> Any:
         results = await self.pool.fetch_all(self.query)
 
-        if self.dict_key_fields is None:
+        key_fields = self.dict_key_fields
+        flat = self.flat
+
+        # list comprehensions are cheaper than generators passed to tuple
+        if key_fields is None:
             parsed_results: Tuple | Dict = (
-                tuple(v for row in results for v in row.values()) if self.flat else tuple(dict(row) for row in results)
+                tuple([v for row in results for v in row.values()]) if flat else tuple([dict(row) for row in results])
             )
         else:
-            parsed_results = {
-                (
-                    tuple(dicted_row.pop(field_name) for field_name in self.dict_key_fields)
-                    if isinstance(self.dict_key_fields, tuple)
-                    else dicted_row.pop(self.dict_key_fields)
-                ): (tuple(dicted_row.values())[0] if self.flat else dicted_row)
-                for row in results
-                if (dicted_row := dict(row))
-            }
+            is_composite_key = isinstance(key_fields, tuple)
+            parsed_results = {}
+
+            for row in results:
+                dicted_row = dict(row)
+                key = (
+                    tuple([dicted_row.pop(field_name) for field_name in key_fields])
+                    if is_composite_key
+                    else dicted_row.pop(key_fields)
+                )
+                # there is only one column left after popping key columns in flat mode
+                parsed_results[key] = next(iter(dicted_row.values())) if flat else dicted_row
 
         final_result = (parsed_results[0] if parsed_results else None) if self.fetch_one else parsed_results
 
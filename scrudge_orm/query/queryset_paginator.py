@@ -1,5 +1,7 @@
-from collections.abc import Mapping
-from typing import TYPE_CHECKING, Any, List, Tuple, Union
+from operator import attrgetter, itemgetter
+from typing import TYPE_CHECKING, Any, List, Mapping, Tuple, Union
+
+from sqlalchemy import and_, tuple_
 
 if TYPE_CHECKING:
     from scrudge_orm.query.queryset import QuerySet
@@ -9,48 +11,56 @@ class QuerySetPaginator:
     def __init__(
         self,
         queryset: "QuerySet",
-        pagination_field: str,
+        pagination_field: str | Tuple[str, ...],
         limit: int = 20,
         order_desc: bool = False,
         is_increase: bool = True,
         start_pagination_value: Any = None,
         nulls_last: bool = False,
+        emit_redundant_seek_predicate: bool = True,
     ):
         """
         Paginator class constructor
-        :param pagination_field: column to paginate
+        :param pagination_field: column to paginate. Several columns can be passed to paginate by
+        not unique column, the last one should make key unique, e.g. ("created", "id")
         :param limit: paginated items limit
         :param order_desc: flag, that means order by expression should be reverse (DESC).
         If false order by expression is ASC
         :param is_increase: flag, that paginator is increases, else decreases
+        :param start_pagination_value: pagination value of the last item of previous page,
+        tuple of values if several columns are paginated
+        :param emit_redundant_seek_predicate: add condition on the first column to row value comparison of
+        several columns. It doesn't change results, but lets planner use range scan on the first index column
         """
         self.queryset = queryset
         self.pagination_field = pagination_field
+        self.pagination_fields = (pagination_field,) if isinstance(pagination_field, str) else pagination_field
         self.order_desc = order_desc
         self.limit = limit
         self.is_increase = is_increase
         self.start_pagination_value = start_pagination_value
-        self.pagination_field_serialized = self.pagination_field.replace("__", ".")
+        self.pagination_fields_serialized = tuple(field.replace("__", ".") for field in self.pagination_fields)
+        # raw querysets return mappings and models otherwise, attrgetter follows dotted path of joined models
+        self.extract_item_value = itemgetter(*self.pagination_fields_serialized)
+        self.extract_attr_value = attrgetter(*self.pagination_fields_serialized)
+        # rows are fetched in pagination direction, it's reverse to requested order for some combinations
+        self.reverse_results = order_desc == is_increase
         self.nulls_last = nulls_last
+        self.emit_redundant_seek_predicate = emit_redundant_seek_predicate
 
     async def paginate_query(self) -> Tuple[Union[List, Tuple], Any]:
         """
         Transform query to query with pagination conditions
-        :param start_pagination_value: start pagination value
-        :return: Select query with pagination conditions
+        :return: Tuple with pagination results and next pagination value
         """
+        # rows are fetched in pagination direction, database seeks by index right after the previous page
         self.queryset = self.queryset.order_by(
-            self.pagination_field, order_desc=self.order_desc, nulls_last=self.nulls_last
+            *self.pagination_fields, order_desc=not self.is_increase, nulls_last=self.nulls_last
         )
-        self.queryset = self.queryset.limit(self.limit + 1)
+        self.queryset = self.queryset.limit(self.limit)
 
-        # >= condition, because some results can have similar value if column not unique
-        # it's better to get results twice, than skip some results
         if self.start_pagination_value is not None:
-            operator = "ge" if self.is_increase else "le"
-            self.queryset = self.queryset.filter(
-                **{f"{self.pagination_field}__{operator}": self.start_pagination_value}
-            )
+            self.queryset.where_conditions.append(self.get_seek_condition())
 
         results = await self.queryset
         return self.get_next_pagination_value_and_final_results(results)
@@ -58,37 +68,53 @@ class QuerySetPaginator:
     def __await__(self) -> Any:
         return self.paginate_query().__await__()
 
-    def get_limit_exceeded_last_item_index(self) -> int:
+    def get_seek_condition(self) -> Any:
         """
-        return last item index of pagination results if query limit exceeded
-        :return: last item index
+        Strict condition of rows after the previous page, rows with the same key aren't fetched twice
+        :return: sqlalchemy expression, row value comparison for several columns
         """
-        if (self.order_desc and not self.is_increase) or (not self.order_desc and self.is_increase):
-            index = -1
-        else:
-            index = 0
+        columns = [self.queryset._get_column_by_name(field) for field in self.pagination_fields]
 
-        return index
+        if len(columns) == 1:
+            # paginator returns 1-tuple as next value if pagination field is passed as tuple
+            value = (
+                self.start_pagination_value[0]
+                if isinstance(self.pagination_field, tuple)
+                else self.start_pagination_value
+            )
+            return columns[0] > value if self.is_increase else columns[0] < value
+
+        left, right = tuple_(*columns), tuple_(*self.start_pagination_value)
+        condition = left > right if self.is_increase else left < right
+
+        if self.emit_redundant_seek_predicate:
+            first_column, first_value = columns[0], self.start_pagination_value[0]
+            condition = and_(
+                first_column >= first_value if self.is_increase else first_column <= first_value, condition
+            )
+
+        return condition
 
     def get_next_pagination_value_and_final_results(
         self, results: Union[List, Tuple]
     ) -> Tuple[Union[List, Tuple], Any]:
         """
-        Get slice of pagination results if query limit exceeded and return next pagination value
-        :param results: results of pagination query
+        Return results in requested order and next pagination value
+        :param results: results of pagination query in pagination direction
         :return: Tuple with pagination results and next pagination value
         """
-        if len(results) > self.limit:
-            last_item_index = self.get_limit_exceeded_last_item_index()
+        if len(results) < self.limit or not results:
+            next_pagination_value = None
+        else:
+            # queryset can be switched to raw after paginator is created, so getter is chosen by row type
+            last_item = results[-1]
+            extract_value = self.extract_item_value if isinstance(last_item, Mapping) else self.extract_attr_value
+            # getter returns value for one column and tuple for several columns
+            next_pagination_value = extract_value(last_item)
 
-            if isinstance(results[last_item_index], Mapping):
-                next_pagination_value = results[last_item_index][self.pagination_field_serialized]
-            else:
-                next_pagination_value = getattr(results[last_item_index], self.pagination_field_serialized)
+            if isinstance(self.pagination_field, tuple) and len(self.pagination_field) == 1:
+                next_pagination_value = (next_pagination_value,)
 
-            final_results = results[1:] if last_item_index == 0 else results[0 : self.limit]
-        else:
-            next_pagination_value = None
-            final_results = results
+        final_results = results[::-1] if self.reverse_results else results
 
         return final_results, next_pagination_value
@@ -1,34 +1,38 @@
+from types import SimpleNamespace
+
+from sqlalchemy import Column, Integer, MetaData, Table
+
 from scrudge_orm.query.queryset_paginator import QuerySetPaginator
 
 
 class TestGetResultsAndNextPaginationValue:
     limit = 4
-    asc_results = [{"id": item} for item in range(1, 6)]  # 1,2,3,4,5
-    desc_results = list(reversed(asc_results))  # 5,4,3,2,1
+    asc_results = [{"id": item} for item in range(1, 5)]  # 1,2,3,4
+    desc_results = list(reversed(asc_results))  # 4,3,2,1
     column = "id"
 
-    def test_asc_increasing_limit_exceeded(self) -> None:
+    def test_asc_increasing_limit_reached(self) -> None:
         paginator = QuerySetPaginator(None, self.column, limit=self.limit)  # type: ignore
         results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.asc_results)
 
         assert results == [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
-        assert next_pagination_value == 5
+        assert next_pagination_value == 4
 
-    def test_asc_decreasing_limit_exceeded(self) -> None:
+    def test_asc_decreasing_limit_reached(self) -> None:
         paginator = QuerySetPaginator(None, self.column, limit=self.limit, is_increase=False)  # type: ignore
-        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.asc_results)
+        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.desc_results)
 
-        assert results == [{"id": 2}, {"id": 3}, {"id": 4}, {"id": 5}]
+        assert results == [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
         assert next_pagination_value == 1
 
-    def test_desc_increasing_limit_exceeded(self) -> None:
+    def test_desc_increasing_limit_reached(self) -> None:
         paginator = QuerySetPaginator(None, self.column, limit=self.limit, order_desc=True)  # type: ignore
-        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.desc_results)
+        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.asc_results)
 
         assert results == [{"id": 4}, {"id": 3}, {"id": 2}, {"id": 1}]
-        assert next_pagination_value == 5
+        assert next_pagination_value == 4
 
-    def test_desc_decreasing_limit_exceeded(self) -> None:
+    def test_desc_decreasing_limit_reached(self) -> None:
         paginator = QuerySetPaginator(
             None,  # type: ignore
             self.column,
@@ -38,12 +42,57 @@ class TestGetResultsAndNextPaginationValue:
         )
         results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.desc_results)
 
-        assert results == [{"id": 5}, {"id": 4}, {"id": 3}, {"id": 2}]
+        assert results == [{"id": 4}, {"id": 3}, {"id": 2}, {"id": 1}]
         assert next_pagination_value == 1
 
-    def test_limit_not_exceeded(self) -> None:
+    def test_limit_not_reached(self) -> None:
         paginator = QuerySetPaginator(None, self.column, limit=self.limit + 1)  # type: ignore
-        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.desc_results)
+        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(self.asc_results)
 
-        assert results == self.desc_results
+        assert results == self.asc_results
         assert next_pagination_value is None
+
+    def test_several_columns(self) -> None:
+        paginator = QuerySetPaginator(None, ("created", "id"), limit=2)  # type: ignore
+        results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(
+            [{"created": 1, "id": 5}, {"created": 1, "id": 7}]
+        )
+
+        assert results == [{"created": 1, "id": 5}, {"created": 1, "id": 7}]
+        assert next_pagination_value == (1, 7)
+
+    def test_model_results(self) -> None:
+        queryset = SimpleNamespace(return_raw=False)
+        paginator = QuerySetPaginator(queryset, "author__id", limit=1)  # type: ignore
+        results = [SimpleNamespace(id=3, author=SimpleNamespace(id=8))]
+        final_results, next_pagination_value = paginator.get_next_pagination_value_and_final_results(results)
+
+        assert final_results == results
+        assert next_pagination_value == 8
+
+    def test_queryset_switched_to_raw(self) -> None:
+        queryset = SimpleNamespace(return_raw=False)
+        paginator = QuerySetPaginator(queryset, "id", limit=1)  # type: ignore
+        queryset.return_raw = True
+        _, next_pagination_value = paginator.get_next_pagination_value_and_final_results([{"id": 3}])
+
+        assert next_pagination_value == 3
+
+
+class TestSeekCondition:
+    table = Table("paginated_table", MetaData(), Column("id", Integer), Column("created", Integer))
+    queryset = SimpleNamespace(return_raw=True, _get_column_by_name=lambda name: TestSeekCondition.table.c[name])
+
+    def test_single_column_tuple_value(self) -> None:
+        paginator = QuerySetPaginator(self.queryset, ("id",), start_pagination_value=(5,))  # type: ignore
+        condition = paginator.get_seek_condition().compile()
+
+        assert str(condition) == "paginated_table.id > :id_1"
+        assert condition.params == {"id_1": 5}
+
+    def test_single_column_value(self) -> None:
+        paginator = QuerySetPaginator(self.queryset, "id", start_pagination_value=5, is_increase=False)  # type: ignore
+        condition = paginator.get_seek_condition().compile()
+
+        assert str(condition) == "paginated_table.id < :id_1"
+        assert condition.params == {"id_1": 5}
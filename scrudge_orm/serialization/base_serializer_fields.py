@@ -1,5 +1,6 @@
-from functools import partial
-from typing import TYPE_CHECKING, Any, DefaultDict, Dict, Iterable, Optional, Tuple, Type
+from collections import defaultdict
+from functools import cached_property, partial
+from typing import TYPE_CHECKING, Any, DefaultDict, Dict, Iterable, List, Optional, Tuple, Type
 
 from scrudge_orm.utils.sqalchemy import find_foreign_key_relation
 
@@ -32,6 +33,16 @@ class PrefetchFieldBase:
         objs_by_relation_attr: DefaultDict,
         additional_prefetch_data: Optional[Dict[str, Any]] = None,
     ) -> None:
+        """
+        Fetch and serialize related objects into objs. Serializer gathers prefetch fields concurrently
+        outside of transaction, so implementation should change only prefetch_field_root_model_name key of objs
+        :param objs: serialized objects of root model
+        :param root_model: Serializer root model class
+        :param prefetch_field_root_model_name: name of field in objs to fill
+        :param objs_by_relation_attr: objects of root model grouped by relation attribute value
+        :param additional_prefetch_data: additional data for nested serializers
+        :return: None
+        """
         raise NotImplementedError()
 
 
@@ -51,6 +62,14 @@ class AutoPrefetchField(PrefetchFieldBase):
         return []
 
     def get_columns_to_select(self) -> Optional[Tuple["ColumnElement", ...]]:
+        return self.resolved_columns_to_select
+
+    @cached_property
+    def resolved_columns_to_select(self) -> Optional[Tuple["ColumnElement", ...]]:
+        """
+        Columns of prefetched model are resolved once, the same tuple is used by every serialization
+        :return: tuple of columns or None to select all columns
+        """
         if self.columns_to_select is not None:
             columns_to_select = tuple(self.columns_to_select)
 
@@ -94,12 +113,18 @@ class PrefetchFieldManyToMany(AutoPrefetchField):
             else prefetched_results
         )
 
+        # items are grouped by key first, every related object list is extended once
+        items_by_key: DefaultDict[Any, List[Dict]] = defaultdict(list)
+
         for item in serialized_data:
             current_to_through_model_keys = item.pop(self._m2m_aggr_field)
 
             for key in current_to_through_model_keys:
-                for obj in objs_by_relation_attr[key]:
-                    obj[prefetch_field_root_model_name].append(item)
+                items_by_key[key].append(item)
+
+        for key, items in items_by_key.items():
+            for obj in objs_by_relation_attr[key]:
+                obj[prefetch_field_root_model_name].extend(items)
 
     async def serialize(
         self,
@@ -137,6 +162,23 @@ class PrefetchFieldOneToMany(AutoPrefetchField):
         _, root_model_column = find_foreign_key_relation(self.source_field.to_manager.table, root_model.objects.table)
         return root_model_column.name
 
+    @cached_property
+    def o2m_columns_to_select(self) -> Tuple["ColumnElement", ...]:
+        """
+        Columns of prefetched model with foreign key column to current model, it's needed to match rows
+        :return: tuple of columns
+        """
+        columns_to_select = self.get_columns_to_select() or ()
+
+        destination_model_col_to_current, _ = find_foreign_key_relation(
+            self.source_field.to_manager.table, self.source_field.current_manager.table
+        )
+
+        if destination_model_col_to_current not in columns_to_select:
+            columns_to_select = columns_to_select + (destination_model_col_to_current,)
+
+        return columns_to_select
+
     async def serialize_prefetched_data(
         self,
         prefetched_results: Tuple[Dict, ...],
@@ -154,11 +196,17 @@ class PrefetchFieldOneToMany(AutoPrefetchField):
             self.source_field.to_manager.table, self.source_field.current_manager.table
         )
 
+        # rows are grouped by key first, every related object list is extended once
+        rows_by_key: DefaultDict[Any, List[Dict]] = defaultdict(list)
+
+        column_name = destination_model_col_to_current.name
+
         for row in serialized_data:
-            key = row[destination_model_col_to_current.name]
+            rows_by_key[row[column_name]].append(row)
 
+        for key, rows in rows_by_key.items():
             for obj in objs_by_relation_attr[key]:
-                obj[prefetch_field_root_model_name].append(row)
+                obj[prefetch_field_root_model_name].extend(rows)
 
     async def serialize(
         self,
@@ -168,19 +216,10 @@ class PrefetchFieldOneToMany(AutoPrefetchField):
         objs_by_relation_attr: DefaultDict,
         additional_prefetch_data: Optional[Dict[str, Any]] = None,
     ) -> None:
-        columns_to_select = self.get_columns_to_select() or ()
-
-        destination_model_col_to_current, _ = find_foreign_key_relation(
-            self.source_field.to_manager.table, self.source_field.current_manager.table
-        )
-
-        if destination_model_col_to_current not in columns_to_select:
-            columns_to_select = columns_to_select + (destination_model_col_to_current,)
-
         await root_model.objects.get_prefetch_related_queryset_o2m(
             self.source_field,
             objs_by_relation_attr,
-            columns_to_select=columns_to_select,
+            columns_to_select=self.o2m_columns_to_select,
         ).add_callback(
             partial(
                 self.serialize_prefetched_data,
@@ -219,10 +258,10 @@ class PrefetchFieldOneToOne(PrefetchFieldOneToMany):
             self.source_field.to_manager.table, self.source_field.current_manager.table
         )
 
-        for row in serialized_data:
-            key = row[destination_model_col_to_current.name]
+        column_name = destination_model_col_to_current.name
 
-            for obj in objs_by_relation_attr[key]:
+        for row in serialized_data:
+            for obj in objs_by_relation_attr[row[column_name]]:
                 obj[prefetch_field_root_model_name] = row
 
 
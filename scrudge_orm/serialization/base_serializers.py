@@ -324,7 +324,7 @@ class BaseModelSerializer(BaseModel, metaclass=BaseModelSerializerMeta):
                     )
                 )
 
-        is_any_backend_on_transaction = any(ON_TRANSACTION.get().values())
+        is_any_backend_on_transaction = bool(ON_TRANSACTION.get())
 
         # can't gather if any of backends pool in transaction state
         if is_any_backend_on_transaction:
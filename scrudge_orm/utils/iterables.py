@@ -0,0 +1,19 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def paginate(items: Iterable[T], page_size: int) -> Iterator[List[T]]:
+    """
+    Split iterable into lists with page_size elements, the last page can be shorter
+    :param items: any iterable to split
+    :param page_size: max amount of elements in page
+    :return: iterator of pages
+    """
+    assert page_size > 0, "page_size should be positive"
+
+    iterator = iter(items)
+
+    while page := list(islice(iterator, page_size)):
+        yield page
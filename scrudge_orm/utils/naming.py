@@ -1,7 +1,11 @@
+import sys
+
+
 def get_register_model_name(module_name: str, model_name: str) -> str:
     splitted_module_name = tuple(filter(lambda obj: obj and obj != "models", module_name.split(".")))
 
-    return f"{splitted_module_name[-1]}.{model_name}" if splitted_module_name else model_name
+    # register names are keys of registry dicts and sets, interned strings are compared by identity
+    return sys.intern(f"{splitted_module_name[-1]}.{model_name}" if splitted_module_name else model_name)
 
 
 def get_table_name_for_class(class_name: str, module: str) -> str:
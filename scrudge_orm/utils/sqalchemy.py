@@ -32,6 +32,22 @@ def get_table_unique_constraints_fields(table: "Table") -> Dict[Tuple[str, ...],
     return unique_with_where_part
 
 
+def copy_column(column: "Column") -> "Column":
+    """
+    Copy column without table, so it can be added to another table
+    :param column: sqlalchemy column
+    :return: new column with the same type, flags, defaults and foreign keys
+    """
+    copied_column = column._copy()  # type: ignore
+
+    # foreign keys of column added to table belong to table constraints, _copy() skips them
+    for foreign_key in column.foreign_keys:
+        if foreign_key.constraint is not None:
+            copied_column.append_foreign_key(foreign_key._copy())  # type: ignore
+
+    return copied_column
+
+
 @lru_cache
 def find_foreign_key_relation(from_table: "Table", to_table: "Table") -> Tuple["Column", "Column"]:
     for fk in from_table.foreign_keys:
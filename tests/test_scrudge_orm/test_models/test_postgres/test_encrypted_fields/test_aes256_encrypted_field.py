@@ -0,0 +1,70 @@
+import pickle
+
+from scrudge_orm.crypto.aes256.cipher import AESCipher, get_cipher
+from scrudge_orm.crypto.aes256.encrypted_field import AES256EncryptedBinary, AES256EncryptedString
+
+
+class TestAESCipher:
+    key = "unit_test_key"
+    cipher = AESCipher(key)
+
+    def test_decrypt_legacy_values(self) -> None:
+        # values were encrypted by pycryptodome based implementation, stored data must be decrypted
+        assert (
+            self.cipher.decrypt("HbTFZGhaUzYi294CPVEmkLRNq79DcnjFh8WTchcnPYEYQrI8Hc7VXsFkx1T9hova")
+            == "unit_test_string"
+        )
+        assert self.cipher.decrypt("s8yJp8useDgLyYYSS4YNI2v5CaJsBgfnBIX46x6YRmw=") == "строка"
+        assert self.cipher.decrypt_raw(b"DWOKrs4Gegw1xrIRp9Du5jG0lXJHUF3owgn/yKxbkjg=") == b"\x00\x01binary"
+
+    def test_round_trip(self) -> None:
+        for value in ("", "unit_test_string", "a" * 16, "строка"):
+            encrypted_value = self.cipher.encrypt(value)
+
+            assert encrypted_value != value
+            assert self.cipher.decrypt(encrypted_value) == value
+
+        assert self.cipher.decrypt_raw(self.cipher.encrypt_raw(b"\x00\x01binary")) == b"\x00\x01binary"
+
+    def test_random_iv(self) -> None:
+        assert self.cipher.encrypt("unit_test_string") != self.cipher.encrypt("unit_test_string")
+
+    def test_binary_round_trip(self) -> None:
+        for value in (b"", b"\x00\x01binary", b"b" * 32):
+            encrypted_value = self.cipher.encrypt_raw_binary(value)
+
+            # iv and padded ciphertext are stored without base64 encoding
+            assert len(encrypted_value) == 16 + (len(value) // 16 + 1) * 16
+            assert self.cipher.decrypt_raw_binary(encrypted_value) == value
+
+    def test_shared_cipher(self) -> None:
+        assert get_cipher(self.key) is get_cipher(self.key)
+        assert get_cipher(self.key).decrypt(self.cipher.encrypt("unit_test_string")) == "unit_test_string"
+
+
+class TestAES256EncryptedFields:
+    key = "unit_test_key"
+    binary_cls = AES256EncryptedBinary.create_cls("UnitTest", key)
+    string_cls = AES256EncryptedString.create_cls("UnitTest", key)
+
+    def test_binary_field(self) -> None:
+        value = self.binary_cls(b"\x00\x01binary")
+        encrypted_value = value.encrypt()
+
+        assert encrypted_value.startswith(b"aes256b:")
+        assert self.binary_cls(encrypted_value) == b"\x00\x01binary"
+        assert self.binary_cls.decrypt_value(encrypted_value) == b"\x00\x01binary"
+
+    def test_string_field(self) -> None:
+        encrypted_value = self.string_cls("unit_test_string").encrypt()
+
+        assert encrypted_value.startswith("aes256:")
+        assert self.string_cls(encrypted_value) == "unit_test_string"
+
+    def test_create_cls_is_reused(self) -> None:
+        assert AES256EncryptedString.create_cls("UnitTest", self.key) is self.string_cls
+        assert AES256EncryptedBinary.create_cls("UnitTest", self.key) is self.binary_cls
+
+    def test_pickle(self) -> None:
+        for value in (self.string_cls("unit_test_string"), self.binary_cls(b"\x00\x01binary")):
+            assert pickle.loads(pickle.dumps(value)) == value
@@ -17,6 +17,34 @@ class TestSHA512CryptoField:
         assert isinstance(obj.field_str, str)
         assert obj.field_str == SHA512EncryptedString.encrypt_value(self.field_str_value)
 
+    def test_encrypt_many(self) -> None:
+        encrypted_value = SHA512EncryptedString.encrypt_value(self.field_str_value)
+
+        assert SHA512EncryptedString.encrypt_many([self.field_str_value, encrypted_value]) == [
+            encrypted_value,
+            encrypted_value,
+        ]
+
+    def test_encrypt_cache_disabled_by_default(self) -> None:
+        assert SHA512EncryptedString._cached_encrypt_function is None
+        assert SHA512EncryptedString.get_encrypt_function() == SHA512EncryptedString._encrypt_function
+
+    def test_encrypt_cache(self) -> None:
+        SHA512EncryptedString.enable_cache(maxsize=2)
+
+        try:
+            first_value = SHA512EncryptedString.encrypt_value(self.field_str_value)
+
+            assert SHA512EncryptedString.encrypt_value(self.field_str_value) == first_value
+            assert SHA512EncryptedString._cached_encrypt_function.cache_info().hits == 1  # type: ignore
+
+            SHA512EncryptedString.cache_clear()
+            assert SHA512EncryptedString._cached_encrypt_function.cache_info().currsize == 0  # type: ignore
+        finally:
+            SHA512EncryptedString.disable_cache()
+
+        assert SHA512EncryptedString._cached_encrypt_function is None
+
     def test_pickle(self) -> None:
         obj = self.schema(field_str=self.field_str_value)
         pickled_obj = pickle.dumps(obj)
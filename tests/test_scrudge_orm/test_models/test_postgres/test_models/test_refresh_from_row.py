@@ -0,0 +1,54 @@
+import warnings
+from typing import Any, Dict
+
+import pytest
+from asyncpg.protocol.protocol import _create_record
+from databases.backends.postgres import PostgresConnection, Record
+from sqlalchemy.dialects import postgresql
+
+from tests.test_scrudge_orm.models import UnitTestIDPkPostgresModel
+
+
+def build_record(values: Dict[str, Any]) -> Record:
+    """
+    Build databases record of the same type as postgres backend returns for insert with returning part
+    :param values: row values by column names
+    :return: databases record
+    """
+    table = UnitTestIDPkPostgresModel.objects.table
+    dialect = postgresql.dialect()
+    result_columns = table.insert().returning(*table.c).compile(dialect=dialect)._result_columns  # type: ignore
+    row = _create_record({name: index for index, name in enumerate(values)}, tuple(values.values()))
+
+    return Record(row, result_columns, dialect, PostgresConnection._create_column_maps(result_columns))
+
+
+class TestRefreshFromRow:
+    def test_record(self) -> None:
+        obj = UnitTestIDPkPostgresModel(int_field=1)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            UnitTestIDPkPostgresModel.objects.refresh_from_row(obj, build_record({"id": 5, "int_field": 7}))
+
+        assert obj.id == 5
+        assert obj.int_field == 7
+        assert {"id", "int_field"} <= obj.model_fields_set
+
+    def test_values_are_validated(self) -> None:
+        obj = UnitTestIDPkPostgresModel(int_field=1)
+        UnitTestIDPkPostgresModel.objects.refresh_from_row(obj, {"id": "5"})
+
+        assert obj.id == 5
+
+    def test_trusted_record(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(UnitTestIDPkPostgresModel.Meta, "trust_db", True)
+        obj = UnitTestIDPkPostgresModel(int_field=1)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            UnitTestIDPkPostgresModel.objects.refresh_from_row(obj, build_record({"id": 5, "int_field": 7}))
+
+        assert obj.id == 5
+        assert obj.int_field == 7
+        assert {"id", "int_field"} <= obj.model_fields_set
@@ -73,6 +73,41 @@ async def test_query_comparison_exclude() -> None:
     assert results == ()
 
 
+@pytest.mark.asyncio
+async def test_query_in_filter_and_exclude() -> None:
+    results = (
+        await UnitTestOptionalPostgresModel.objects.filter(int_field__in=[1, 2])
+        .values_list("int_field", flat=True)
+        .order_by("int_field")
+    )
+
+    assert results == (1, 2)
+
+    results = (
+        await UnitTestOptionalPostgresModel.objects.filter(int_field__not_in=[1, 2])
+        .values_list("int_field", flat=True)
+        .order_by("int_field")
+    )
+
+    assert results == (3, 4, 5)
+
+    results = (
+        await UnitTestOptionalPostgresModel.objects.exclude(int_field__in=[1, 2])
+        .values_list("int_field", flat=True)
+        .order_by("int_field")
+    )
+
+    assert results == (3, 4, 5)
+
+    results = (
+        await UnitTestOptionalPostgresModel.objects.exclude(int_field__not_in=[1, 2])
+        .values_list("int_field", flat=True)
+        .order_by("int_field")
+    )
+
+    assert results == (1, 2)
+
+
 @pytest.mark.asyncio
 async def test_multiple_filter_expressions() -> None:
     results = (